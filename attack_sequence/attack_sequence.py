@@ -8,21 +8,25 @@ import numpy as np
 import pygame
 from utils.adb_utils import ADBUtils
 from utils.image_utils import ImageUtils
+from utils.debug_utils import DebugVisualizer
 from search_sequence.search_sequence import SearchSequence
 
+FOUND_SOUND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "found.mp3")
+
 class AttackSequence:
-    def __init__(self, target_percentage=50):
+    def __init__(self, target_percentage=50, adb=None):
         """
         Initialize the attack sequence with a target destruction percentage.
         
         Args:
             target_percentage: Minimum destruction percentage to achieve (default: 50 for one star)
+            adb: Shared ADBUtils instance (a new one is created if not given)
         """
-        self.adb = ADBUtils()
+        self.adb = adb or ADBUtils()
         self.image = ImageUtils()
         self.image_folder = os.path.join(os.path.dirname(__file__), "images")
         self.target_percentage = target_percentage
-        self.search_sequence = SearchSequence(gold_threshold=1000000, elixir_threshold=1000000, dark_threshold=5000)
+        self.search_sequence = SearchSequence(gold_threshold=1000000, elixir_threshold=1000000, dark_threshold=5000, adb=self.adb)
         # Initialize deployment locations dictionary
         self.deployment_locations = {}
         
@@ -47,67 +51,57 @@ class AttackSequence:
         # Deploy all troops in sequence
         self.deploy_all()
 
-        # Wait a short time for deployment animations
-        logging.info("Waiting for deployment animations to complete...")
-        time.sleep(3)
-
-        # Try to find and click the return home or claim reward button
+        # Wait out the battle for the return home or claim reward button. One wait covers the
+        # whole battle, so polling backs off to every few seconds instead of restarting
         return_buttons = ["return_home.png", "claim_reward.png"]
-        max_attempts = 30
-        found_button = None
-
-        for attempt in range(max_attempts):
-            logging.info(f"Attempt {attempt + 1}/{max_attempts}: Looking for return home or claim reward button...")
-            time.sleep(5)  # Wait before checking again
-
-            # Check if any of the buttons are detected with confidence ≥ 0.8
-            for button in return_buttons:
-                if self.image.detect_image(self.adb, self.image_folder, button, confidence_threshold=0.8):
-                    found_button = button
-                    break  # Stop searching once a button is found
-
-            if found_button:
-                if found_button == "claim_reward.png":
-                    logging.info("🏆 Claim reward button found. Running alternative exit sequence.")
-                    if self.image.find_and_click_image(self.adb, self.image_folder, found_button, confidence_threshold=0.8):
-                        logging.info("✅ Clicked claim reward button")
-
-                    # Perform additional clicks at predefined location (1240, 330)
-                    time.sleep(3)
-                    for _ in range(5):
-                        time.sleep(1)
-                        self.adb.humanlike_click(1240, 330)
-
-                    # Now wait for "continue.png" to appear and click it
-                    logging.info("🔄 Waiting for continue button...")
-                    max_continue_attempts = 30
-                    for attempt in range(max_continue_attempts):
-                        if self.image.detect_image(self.adb, self.image_folder, "continue.png", confidence_threshold=0.8):
-                            logging.info("▶️ Continue button found! Clicking...")
-                            if self.image.find_and_click_image(self.adb, self.image_folder, "continue.png", confidence_threshold=0.8):
-                                logging.info("✅ Clicked continue button")
-                                return True  # Exit successfully
-                        else:
-                            logging.info(f"Continue button not found (Attempt {attempt + 1}/{max_continue_attempts}). Clicking predefined location...")
-                            self.adb.humanlike_click(1240, 330)  # Click at predefined location as a fallback
-                            time.sleep(2)  # Wait before checking again
-
-                    logging.warning("⚠️ Could not find continue button after multiple attempts.")
-                    logging.info("Attack sequence completed with issues.")
-                    return False
-
-                else:
-                    logging.info("🏠 Return home button found. Running normal exit sequence.")
-                    if self.image.find_and_click_image(self.adb, self.image_folder, found_button, confidence_threshold=0.8):
-                        logging.info(f"✅ Found and clicked {found_button}")
-                        time.sleep(2)  # Wait for button click to take effect
-                        logging.info("Attack sequence completed.")
-                        return True
-
-            logging.info("Return home or claim reward button not found, retrying...")
-            time.sleep(1)
+        battle_timeout = 180
+        deadline = time.monotonic() + battle_timeout
+
+        while time.monotonic() < deadline:
+            logging.info("Waiting for return home or claim reward button...")
+            found_button, frame = self.image.wait_for(self.adb, any_of=return_buttons, image_folder=self.image_folder,
+                                                      timeout=deadline - time.monotonic(), confidence_threshold=0.8,
+                                                      max_interval=5)
+            if not found_button:
+                break
+
+            if found_button == "claim_reward.png":
+                logging.info("🏆 Claim reward button found. Running alternative exit sequence.")
+                if self.image.find_and_click_image(self.adb, self.image_folder, found_button, confidence_threshold=0.8, frame=frame):
+                    logging.info("✅ Clicked claim reward button")
+
+                # Click through the reward screens at (1240, 330) until "continue.png" appears, then click it
+                logging.info("🔄 Waiting for continue button...")
+                max_continue_attempts = 30
+                for attempt in range(max_continue_attempts):
+                    found, continue_frame = self.image.wait_for(self.adb, any_of=["continue.png"], image_folder=self.image_folder,
+                                                                timeout=2, confidence_threshold=0.8)
+                    if found:
+                        logging.info("▶️ Continue button found! Clicking...")
+                        if self.image.find_and_click_image(self.adb, self.image_folder, "continue.png", confidence_threshold=0.8, frame=continue_frame):
+                            logging.info("✅ Clicked continue button")
+                            return True  # Exit successfully
+                    else:
+                        logging.info(f"Continue button not found (Attempt {attempt + 1}/{max_continue_attempts}). Clicking predefined location...")
+                        self.adb.humanlike_click(1240, 330)  # Click at predefined location as a fallback
+
+                logging.warning("⚠️ Could not find continue button after multiple attempts.")
+                logging.info("Attack sequence completed with issues.")
+                return False
 
-        logging.warning("⚠️ Could not find return home button after multiple attempts.")
+            else:
+                logging.info("🏠 Return home button found. Running normal exit sequence.")
+                if self.image.find_and_click_image(self.adb, self.image_folder, found_button, confidence_threshold=0.8, frame=frame):
+                    logging.info(f"✅ Found and clicked {found_button}")
+                    # Wait for the click to take effect
+                    self.image.wait_for(self.adb, none_of=[found_button], image_folder=self.image_folder, timeout=5)
+                    logging.info("Attack sequence completed.")
+                    return True
+
+            # The button was found but the click did not take; look for it again
+            logging.info("Return home or claim reward button not clicked, retrying...")
+
+        logging.warning(f"⚠️ Could not find return home button within {battle_timeout}s.")
         logging.info("Attack sequence completed with issues.")
         return False
 
@@ -132,7 +126,7 @@ class AttackSequence:
                 logging.info("🎯 Target acquired! Initiating attack...")
                 
                 pygame.mixer.init()
-                pygame.mixer.music.load("found.mp3")
+                pygame.mixer.music.load(FOUND_SOUND)
                 pygame.mixer.music.play()
                 while pygame.mixer.music.get_busy():
                     pass  # Wait for audio to finish playing
@@ -166,7 +160,8 @@ class AttackSequence:
         logging.info("-"*40)
 
         # Take a screenshot for troop detection
-        if not self.adb.take_screenshot("screen.png"):
+        frame = self.adb.capture_frame()
+        if frame is None:
             logging.error("❌ Failed to take screenshot for deployment preparation")
             return False
 
@@ -189,23 +184,28 @@ class AttackSequence:
         # Scan the bottom part of the screen (where troop selection is)
         # This is the area to focus on for troops/spells/heroes detection
         # We'll create a visualization for debugging
-        debug_image = cv2.imread("screen.png")
-        bottom_region_y = debug_image.shape[0] - 150  # Bottom 150 pixels where troops usually are
-        cv2.rectangle(debug_image, (0, bottom_region_y), (debug_image.shape[1], debug_image.shape[0]), (0, 255, 0), 2)
+        debug = DebugVisualizer()
+        debug.load_screenshot(frame)
+        bottom_region_y = frame.height - 150  # Bottom 150 pixels where troops usually are
+        debug.draw_detection((0, bottom_region_y), (frame.width, 150), "")
         
-        # Loop through each element and try to detect it
+        # Match every element against the screenshot in one pass
+        detections = self.image.detect_many(
+            frame, [image_file for image_file, _ in elements_to_detect.values()], self.image_folder
+        )
+
+        # Loop through each element and record the detected ones
         for element_name, (image_file, count) in elements_to_detect.items():
-            image_path = os.path.join(self.image_folder, image_file)
+            template = self.image.get_template(image_file, self.image_folder)
             
             # Skip if the reference image doesn't exist
-            if not os.path.exists(image_path):
+            if template is None:
                 logging.warning(f"⚠️ Reference image not found: {image_file}")
                 continue
             
-            # Look for the element in the screenshot
-            pos, confidence = self.image.find_image("screen.png", image_path)
+            pos, confidence = detections[image_file]
             
-            if pos and confidence > 0.7:  # Use 0.7 as confidence threshold
+            if pos:
                 # Mark as detected
                 self.deployment_locations[element_name] = {
                     "position": pos,
@@ -215,11 +215,7 @@ class AttackSequence:
                 detected_count += 1
                 
                 # Add to debug visualization
-                template = cv2.imread(image_path)
-                h, w = template.shape[:2]
-                cv2.rectangle(debug_image, pos, (pos[0] + w, pos[1] + h), (0, 255, 0), 2)
-                cv2.putText(debug_image, f"{element_name} ({confidence:.2f})", 
-                          (pos[0], pos[1] - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+                debug.draw_detection(pos, template.size, f"{element_name} ({confidence:.2f})")
                 
                 logging.info(f"✅ Detected {element_name} at {pos} with confidence {confidence:.2f}")
             else:
@@ -239,7 +235,7 @@ class AttackSequence:
             }
         
         # Save the debug visualization
-        cv2.imwrite("troop_detection.png", debug_image)
+        debug.save_visualization("troop_detection.png", failed=detected_count == 0)
         
         logging.info(f"✅ Prepared {detected_count} deployment elements")
         for name, data in self.deployment_locations.items():
@@ -268,10 +264,18 @@ class AttackSequence:
 
         logging.info(f"Deploying {target_count} units of {element_name}")
 
-        # Select the element once
+        # Select the element once, then wait until its card shows as selected
         logging.info(f"Selecting {element_name} at position {element_pos}")
+        before = self.adb.capture_frame()
         self.adb.humanlike_click(*element_pos)
-        time.sleep(0.3)
+        if before is not None:
+            x, y = element_pos
+            card = (max(0, x - 40), max(0, y - 40), min(before.width, x + 40), min(before.height, y + 40))
+            self.image.wait_for(self.adb, any_of=[lambda frame: frame.region_differs(before, card)],
+                                timeout=self.image.latency.timeout("card selected", default=0.3),
+                                transition="card selected")
+        else:
+            time.sleep(self.image.latency.budget("card selected", default=0.3))
 
         # Deploy troops
         for i in range(target_count):
@@ -0,0 +1,57 @@
+"""
+Compare PNG and raw screencap capture latency, through the adb binary or the socket client.
+
+Runs against a fake adb that replays recorded frames, so it measures the host side
+(process spawn, transfer, decode and channel conversion). Device-side PNG encoding is
+not part of the replay; pass --device to measure against a real device instead.
+
+Usage:
+    python -m benchmarks.bench_capture [--frames a.png b.png ...] [--iterations 50]
+                                       [--backend binary socket] [--device]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.replay import DEFAULT_FRAMES, build_replay, start_fake_server
+from utils.adb_utils import ADBUtils
+
+
+def time_capture(adb: ADBUtils, iterations: int) -> list[float]:
+    """Return per-capture latencies in milliseconds."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        if adb.capture_screen() is None:
+            raise RuntimeError(f"{adb.capture_mode} capture failed")
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", nargs="+", default=DEFAULT_FRAMES, help="Recorded frames to replay")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--backend", nargs="+", default=["binary", "socket"], choices=["binary", "socket"])
+    parser.add_argument("--device", action="store_true", help="Capture from the connected device")
+    args = parser.parse_args()
+
+    if not args.device:
+        replay_dir = build_replay(args.frames)
+        if "socket" in args.backend:
+            start_fake_server(os.path.join(replay_dir, "frames"))
+
+    print(f"{'backend':<8} {'mode':<6} {'mean ms':>9} {'median ms':>10} {'p95 ms':>8}")
+    for backend in args.backend:
+        for mode in ("png", "raw"):
+            timings = sorted(time_capture(ADBUtils(capture_mode=mode, backend=backend), args.iterations))
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{backend:<8} {mode:<6} {statistics.mean(timings):>9.1f} {statistics.median(timings):>10.1f} {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Pick the cheapest match mode (gray, edge or BGR) per template from a labelled frame set.
+
+Every template is matched on every frame in each mode. A decision is correct if the
+template is found at its labelled position on a frame that shows it, or not found on a
+frame that doesn't. The margin is the gap between the weakest true match and the
+strongest match on frames without the template. A cheaper mode is chosen only if, at
+every confidence threshold the sequences use (0.6-0.8), it makes at least as many correct
+decisions as BGR, and its margin is no smaller than BGR's. Templates with fewer than
+--min-positives frames showing them or --min-negatives frames without them stay in BGR,
+since too few frames prove nothing about a cheaper mode.
+
+Labels are a JSON file mapping frame paths to {template key: [x, y] or null}; frames or
+templates left out are labelled from full-resolution BGR matches at 0.8, i.e. from what
+the bot detects today.
+
+Usage:
+    python -m benchmarks.bench_match_modes [--frames a.png dir/ ...] [--labels labels.json]
+                                           [--min-positives 5] [--min-negatives 5] [--write]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_matching import load_frames
+from benchmarks.replay import DEFAULT_FRAMES
+from utils.frame import Frame, MATCH_MODES
+from utils.image_utils import ImageUtils
+from utils.template_registry import MATCH_MODES_FILE, Template, TemplateRegistry
+
+# Largest distance in pixels between a match and its label that still counts as correct
+POSITION_TOLERANCE = 3
+
+
+def build_labels(frames, registry, labels_path=None) -> dict:
+    """Return {(frame index, template key): (x, y) or None}, filling gaps from BGR matches."""
+    given = {}
+    if labels_path:
+        with open(labels_path) as f:
+            given = {os.path.abspath(path): entries for path, entries in json.load(f).items()}
+
+    labels = {}
+    for index, (path, image) in enumerate(frames):
+        entries = given.get(os.path.abspath(path), {})
+        frame = Frame(image)
+        for template in registry:
+            if template.key in entries:
+                position = entries[template.key]
+                labels[index, template.key] = tuple(position) if position is not None else None
+                continue
+            position, confidence = ImageUtils.match_template(frame.image, template)
+            labels[index, template.key] = position if confidence >= 0.8 else None
+    return labels
+
+
+def evaluate(frames, template, mode, labels, thresholds):
+    """
+    Match one template in one mode on every frame.
+    Returns (correct decisions per threshold, margin, ms per frame, number of frames showing
+    the template, number of frames without it).
+    """
+    utils = ImageUtils()
+    candidate = Template(template.key, template.path, template.image, mode=mode)
+    positives, negatives = [], []
+    elapsed = 0.0
+    for index, (_, image) in enumerate(frames):
+        frame = Frame(image)
+        start = time.perf_counter()
+        (x, y), confidence = utils.match_coarse_to_fine(frame, candidate)
+        elapsed += time.perf_counter() - start
+
+        label = labels[index, template.key]
+        if label is None:
+            negatives.append(confidence)
+        elif max(abs(x - label[0]), abs(y - label[1])) <= POSITION_TOLERANCE:
+            positives.append(confidence)
+        else:
+            # Best match elsewhere: the template is effectively not found
+            positives.append(0.0)
+
+    correct = [
+        sum(c >= threshold for c in positives) + sum(c < threshold for c in negatives)
+        for threshold in thresholds
+    ]
+    margin = (min(positives) if positives else 1.0) - (max(negatives) if negatives else 0.0)
+    return correct, margin, elapsed * 1000 / len(frames), len(positives), len(negatives)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", nargs="+", default=DEFAULT_FRAMES, help="Recorded frames or directories of frames")
+    parser.add_argument("--labels", help="JSON file with template positions per frame")
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.6, 0.7, 0.8])
+    parser.add_argument("--min-positives", type=int, default=5, help="Frames that must show a template")
+    parser.add_argument("--min-negatives", type=int, default=5, help="Frames that must not show a template")
+    parser.add_argument("--write", action="store_true", help=f"Save the chosen modes to {MATCH_MODES_FILE}")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames)
+    if not frames:
+        sys.exit("No frames found")
+    registry = TemplateRegistry(match_modes={})
+    labels = build_labels(frames, registry, args.labels)
+    print(f"{len(frames)} frames x {len(registry.templates)} templates")
+
+    header = " ".join(f"{mode + ' ms':>9} {mode + ' margin':>12}" for mode in MATCH_MODES)
+    print(f"{'template':<42} {'shown':>5} {header} {'chosen':>7}")
+
+    chosen = {}
+    for template in registry:
+        results = {mode: evaluate(frames, template, mode, labels, args.thresholds) for mode in MATCH_MODES}
+        baseline, baseline_margin = results["bgr"][0], results["bgr"][1]
+        shown, not_shown = results["bgr"][3], results["bgr"][4]
+        # A mode keeps up with BGR if it decides as well at every threshold and separates
+        # the template from everything else by at least as much
+        accurate = {m: all(c >= b for c, b in zip(results[m][0], baseline)) and results[m][1] >= baseline_margin
+                    for m in MATCH_MODES}
+        mode = "bgr"
+        if shown >= args.min_positives and not_shown >= args.min_negatives:
+            # MATCH_MODES is ordered cheapest first
+            mode = next(m for m in MATCH_MODES if accurate[m])
+        if mode != "bgr":
+            chosen[template.key] = mode
+
+        columns = " ".join(
+            f"{ms:>9.1f} {margin:>11.3f}{' ' if accurate[m] else '!'}"
+            for m, (_, margin, ms, _, _) in results.items()
+        )
+        print(f"{template.key:<42} {shown:>5} {columns} {mode:>7}")
+
+    print(f"\n{len(chosen)} of {len(registry.templates)} templates use a cheaper mode than BGR "
+          "('!' marks modes less accurate than BGR or with a smaller margin)")
+    print(f"Templates shown on fewer than {args.min_positives} frames or missing from fewer than "
+          f"{args.min_negatives} stay in BGR")
+    if args.write:
+        with open(MATCH_MODES_FILE, "w") as f:
+            json.dump(dict(sorted(chosen.items())), f, indent=2)
+            f.write("\n")
+        print(f"Saved to {MATCH_MODES_FILE}")
+
+
+if __name__ == "__main__":
+    main()
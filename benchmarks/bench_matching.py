@@ -0,0 +1,107 @@
+"""
+Compare full-resolution and coarse-to-fine pyramid template matching over recorded frames.
+
+Every registry template is matched against the full frame of every recorded frame, once
+at full resolution and once per pyramid level. For each confidence threshold the sequences
+use (0.6-0.8) it reports how often the pyramid result disagrees with the full-resolution
+one (found vs. not found, or found at a different position), and the time per frame.
+
+Usage:
+    python -m benchmarks.bench_matching [--frames a.png dir/ ...] [--levels 1 2]
+                                        [--thresholds 0.6 0.7 0.8] [--repeat 3]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from benchmarks.replay import DEFAULT_FRAMES
+from utils.frame import Frame
+from utils.image_utils import ImageUtils
+from utils.template_registry import get_template_registry
+
+
+def load_frames(paths: list[str]) -> list[tuple[str, object]]:
+    """Load recorded frames from image files and directories of PNGs."""
+    frames = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.png"))) if os.path.isdir(path) else [path]
+        for file in files:
+            image = cv2.imread(file)
+            if image is not None:
+                frames.append((file, image))
+    return frames
+
+
+def run(images, templates, level: int, repeat: int):
+    """
+    Match every template on every frame at the given pyramid level (0: full resolution).
+    Returns the results as {(frame index, template key): (position, confidence)} and the
+    best time per frame in milliseconds.
+    """
+    utils = ImageUtils()
+    utils.PYRAMID_LEVEL = level
+    results = {}
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for index, image in enumerate(images):
+            # A new Frame per run so pyramid construction is part of the timing
+            frame = Frame(image)
+            for template in templates:
+                results[index, template.key] = utils.match_coarse_to_fine(frame, template)
+        best = min(best, (time.perf_counter() - start) * 1000 / len(images))
+    return results, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", nargs="+", default=DEFAULT_FRAMES, help="Recorded frames or directories of frames")
+    parser.add_argument("--levels", nargs="+", type=int, default=[1, 2])
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.6, 0.7, 0.8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames)
+    if not frames:
+        sys.exit("No frames found")
+    images = [image for _, image in frames]
+    templates = list(get_template_registry())
+    print(f"{len(frames)} frames x {len(templates)} templates")
+
+    baseline, baseline_ms = run(images, templates, 0, args.repeat)
+    print(f"{'level':<6} {'ms/frame':>9} {'speedup':>8} " + " ".join(f"{'miss@' + str(t):>9} {'moved@' + str(t):>10}" for t in args.thresholds)
+          + f" {'max Δconf':>10}")
+    print(f"{0:<6} {baseline_ms:>9.1f} {1.0:>8.2f}")
+
+    for level in args.levels:
+        results, ms = run(images, templates, level, args.repeat)
+        columns = []
+        for threshold in args.thresholds:
+            missed = moved = 0
+            for key, (position, confidence) in baseline.items():
+                found = confidence >= threshold
+                pyramid_position, pyramid_confidence = results[key]
+                if found != (pyramid_confidence >= threshold):
+                    missed += 1
+                elif found and position != pyramid_position:
+                    moved += 1
+            columns.append(f"{missed:>9} {moved:>10}")
+        # Confidence difference where full resolution found the template at all
+        delta = max((abs(confidence - results[key][1]) for key, (_, confidence) in baseline.items()
+                     if confidence >= min(args.thresholds)), default=0.0)
+        print(f"{level:<6} {ms:>9.1f} {baseline_ms / ms:>8.2f} " + " ".join(columns) + f" {delta:>10.4f}")
+
+        for (index, key), (position, confidence) in baseline.items():
+            pyramid_position, pyramid_confidence = results[index, key]
+            if confidence >= min(args.thresholds) and (pyramid_confidence < min(args.thresholds) or position != pyramid_position):
+                print(f"    {os.path.basename(frames[index][0])} {key}: full {position} {confidence:.3f} "
+                      f"-> pyramid {pyramid_position} {pyramid_confidence:.3f}")
+
+
+if __name__ == "__main__":
+    main()
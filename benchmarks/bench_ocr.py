@@ -0,0 +1,172 @@
+"""
+Compare the in-process digit recognizer with Tesseract on labelled loot number crops.
+
+Corpus files are named "<value>_<resource>_<capture>.png" and hold one loot number cut
+from a scouting screenshot with the boxes SearchSequence reads (LOOT_BBOXES). Crops from
+the captures the bundled glyphs were cut from (GLYPH_CAPTURES) are listed but not counted:
+only held-out crops, ideally from many scouted bases, say how the recognizer will do
+during a search. For each reader the accuracy (exact value) and the time per crop are
+reported; for the recognizer also the fallback rate (crops it is not confident about and
+hands to Tesseract) and how many confident reads were wrong. Tesseract is timed both crop
+by crop (tesseract_digits, three runs per crop) and through the persistent
+TesseractEngine, reading the crops in batches of three like one base. Keep
+USE_DIGIT_RECOGNIZER (main.py) off until both engines have been measured here.
+
+Usage:
+    python -m benchmarks.bench_ocr [--corpus dir] [--repeat 20]
+    python -m benchmarks.bench_ocr add scouting.png GOLD ELIXIR DARK
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import pytesseract
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_sequence.search_sequence import LOOT_BBOXES
+from utils.ocr import DigitRecognizer, TesseractEngine, tesseract_digits
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_corpus")
+# Captures search_sequence/glyphs was cut from; their crops are training data, not held out
+GLYPH_CAPTURES = ("troop_detection",)
+
+
+def add_crops(screenshot, values, directory) -> list:
+    """
+    Cut the loot boxes out of a scouting screenshot into the corpus.
+
+    Args:
+        screenshot: Path of a scouting screen capture
+        values: The gold, elixir and dark elixir amounts shown, without separators
+        directory: Corpus directory
+
+    Returns:
+        list: Paths of the crops written
+    """
+    image = cv2.imread(screenshot)
+    if image is None:
+        raise SystemExit(f"Could not read {screenshot}")
+    capture = os.path.splitext(os.path.basename(screenshot))[0].replace("_", "-")
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for (resource, (x1, y1, x2, y2)), value in zip(LOOT_BBOXES.items(), values):
+        path = os.path.join(directory, f"{value}_{resource}_{capture}.png")
+        cv2.imwrite(path, image[y1:y2, x1:x2])
+        paths.append(path)
+    return paths
+
+
+def load_corpus(directory) -> list:
+    """Return [(name, expected digits, crop, held out)] for the labelled crops in a directory."""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.png"))):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        name = os.path.basename(path)
+        capture = os.path.splitext(name)[0].split("_", 2)[-1]
+        held_out = capture.replace("-", "_") not in GLYPH_CAPTURES
+        corpus.append((name, name.split("_")[0], image, held_out))
+    return corpus
+
+
+def run_reader(corpus, read, repeat) -> tuple[list, float]:
+    """Read every crop `repeat` times. Returns ([text per crop], ms per crop)."""
+    texts = [read(image) for _, _, image, _ in corpus]
+    start = time.perf_counter()
+    for _ in range(repeat - 1):
+        for _, _, image, _ in corpus:
+            read(image)
+    elapsed = time.perf_counter() - start
+    return texts, elapsed * 1000 / max(1, (repeat - 1) * len(corpus))
+
+
+def run_engine(corpus, engine, repeat) -> tuple[list, float]:
+    """Read the crops through a TesseractEngine in batches of three. Returns ([text per crop], ms per crop)."""
+    inputs = [cv2.bitwise_not(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)) for _, _, image, _ in corpus]
+    batches = [inputs[i:i + 3] for i in range(0, len(inputs), 3)]
+    texts = [text for batch in batches for text in engine.read_lines(batch)]
+    start = time.perf_counter()
+    for _ in range(repeat - 1):
+        for batch in batches:
+            engine.read_lines(batch)
+    elapsed = time.perf_counter() - start
+    return texts, elapsed * 1000 / max(1, (repeat - 1) * len(corpus))
+
+
+def report(label, texts, corpus, ms, note="") -> None:
+    """Print a reader's accuracy on the held-out crops and on all crops."""
+    right = [text == expected for text, (_, expected, _, _) in zip(texts, corpus)]
+    held_out = [r for r, (_, _, _, h) in zip(right, corpus) if h]
+    print(f"{label:<11} held out {sum(held_out)}/{len(held_out)} correct, all {sum(right)}/{len(corpus)}, "
+          f"{ms:.2f} ms per crop{note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", nargs="?", choices=["run", "add"], default="run")
+    parser.add_argument("screenshot", nargs="?", help="add: scouting screen capture to cut the loot boxes from")
+    parser.add_argument("values", nargs="*", help="add: gold, elixir and dark elixir shown (e.g. 1774422 1342954 11789)")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Directory of labelled crops")
+    parser.add_argument("--repeat", type=int, default=20, help="Reads per crop for the timing")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        if not args.screenshot or len(args.values) != len(LOOT_BBOXES):
+            parser.error("add needs a screenshot and the gold, elixir and dark elixir values")
+        for path in add_crops(args.screenshot, args.values, args.corpus):
+            print(f"Saved {path}")
+        return
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        sys.exit(f"No labelled crops in {args.corpus}")
+    recognizer = DigitRecognizer()
+    held_out = sum(h for _, _, _, h in corpus)
+    captures = {name.split("_", 2)[-1] for name, _, _, h in corpus if h}
+    print(f"{len(corpus)} crops, {held_out} held out from {len(captures)} captures, "
+          f"glyphs for digits {''.join(sorted(recognizer.digits))}")
+
+    confidences = [recognizer.recognize(image)[1] for _, _, image, _ in corpus]
+    recognizer_texts, recognizer_ms = run_reader(corpus, lambda image: recognizer.recognize(image)[0], args.repeat)
+    # Tesseract gets the same input the search sequence gives it: inverted gray
+    tesseract_read = lambda image: tesseract_digits(cv2.bitwise_not(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)))
+    try:
+        tesseract_texts, tesseract_ms = run_reader(corpus, tesseract_read, max(2, args.repeat // 10))
+        engine_texts, engine_ms = run_engine(corpus, TesseractEngine(), max(2, args.repeat // 10))
+    except (pytesseract.TesseractNotFoundError, RuntimeError):
+        tesseract_texts = tesseract_ms = engine_texts = engine_ms = None
+
+    print(f"{'crop':<40} {'expected':>10} {'recognizer':>11} {'conf':>6} {'tesseract':>10} {'engine':>10}")
+    for index, (name, expected, _, is_held_out) in enumerate(corpus):
+        tesseract_text = tesseract_texts[index] if tesseract_texts is not None else "-"
+        engine_text = engine_texts[index] if engine_texts is not None else "-"
+        marker = "" if is_held_out else "  (glyph source)"
+        print(f"{name:<40} {expected:>10} {recognizer_texts[index]:>11} {confidences[index]:>6.3f} "
+              f"{tesseract_text:>10} {engine_text:>10}{marker}")
+
+    confident = [recognizer.is_confident(c) and h for c, (_, _, _, h) in zip(confidences, corpus)]
+    right = [text == expected for text, (_, expected, _, _) in zip(recognizer_texts, corpus)]
+    fallbacks = held_out - sum(confident)
+    confident_wrong = sum(c and not r for c, r in zip(confident, right))
+    print()
+    report("recognizer:", recognizer_texts, corpus, recognizer_ms,
+           f", held-out fallback rate {fallbacks / max(held_out, 1):.0%} ({fallbacks} left to Tesseract), "
+           f"{confident_wrong} confident but wrong")
+    if tesseract_texts is None:
+        print("tesseract:  not installed, NOT measured - the comparison is incomplete")
+    else:
+        report("tesseract:", tesseract_texts, corpus, tesseract_ms,
+               f" ({tesseract_ms / max(recognizer_ms, 1e-6):.0f}x the recognizer)")
+        report("engine:", engine_texts, corpus, engine_ms, " in batches of 3")
+    if held_out < 3 * len(LOOT_BBOXES) or tesseract_texts is None:
+        print("\n⚠️ Too few held-out loot crops or no Tesseract results to judge the recognizer: "
+              "keep USE_DIGIT_RECOGNIZER off and add crops from more scouted bases with the add command")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare the serial search loop with SearchPipeline on the replay harness.
+
+The replay plays back a device reacting to taps: after every tap it shows loading
+(cloud) frames for --loading seconds, then the scouting frame, which stays. Thresholds
+are set out of reach, so both searches skip every base; the report is bases per minute
+for each, and per-stage latency for the pipeline.
+
+Both sides run this tree's SearchSequence, so the lazy reads, match cache, fingerprints
+and settle checks are in both and the ratio is the gain from pipelining alone. For the
+gain over an older loop, run this benchmark (or benchmarks/replay.py) in a worktree of
+that commit. Loot is read by the digit recognizer unless --tesseract is given. Each
+search starts from an empty in-memory latency model and records no loot telemetry; the
+benchmark runs in a temporary directory so nothing is written to latency.json or
+loot.sqlite.
+
+Usage:
+    python -m benchmarks.bench_search [--frame scouting.png] [--loading 1.0] [--bases 10] [--tesseract]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.replay import REPO_ROOT, build_replay
+from search_sequence.search_pipeline import SearchPipeline
+from search_sequence.search_sequence import SearchSequence
+from utils.adb_utils import ADBUtils
+from utils.latency import LatencyModel
+
+DEFAULT_FRAME = os.path.join(REPO_ROOT, "troop_detection.png")
+
+
+def build_base_replay(frame_path: str, loading: float):
+    """Replay loading frames for `loading` seconds after every tap, then the scouting frame."""
+    image = cv2.imread(frame_path)
+    if image is None:
+        sys.exit(f"Could not read {frame_path}")
+    cloud_path = os.path.join(tempfile.mkdtemp(prefix="bench_search_"), "cloud.png")
+    cv2.imwrite(cloud_path, np.full_like(image, 230))
+    build_replay([cloud_path, frame_path], frame_time=loading)
+
+
+def new_search(pipelined: bool, use_recognizer: bool) -> SearchSequence:
+    """A search that skips every base, with fresh latency samples and no telemetry."""
+    unreachable = 10 ** 9
+    search = SearchSequence(unreachable, unreachable, unreachable, adb=ADBUtils(), pipelined=pipelined,
+                            use_recognizer=use_recognizer)
+    # Waits learned by one run must not shorten the other's, or leak into a real run's budgets
+    search.image.latency = LatencyModel(path=None)
+    search.base_listeners = []
+    return search
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frame", default=DEFAULT_FRAME, help="Scouting screen capture")
+    parser.add_argument("--loading", type=float, default=1.0, help="Seconds a base takes to load after a tap")
+    parser.add_argument("--bases", type=int, default=10, help="Bases to skip per search")
+    parser.add_argument("--tesseract", action="store_true", help="Read loot with Tesseract, as main.py does by default")
+    parser.add_argument("--verbose", action="store_true", help="Show the search logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+    build_base_replay(os.path.abspath(args.frame), args.loading)
+    # The loot telemetry store opens in the working directory; keep it out of the checkout
+    os.chdir(tempfile.mkdtemp(prefix="bench_search_run_"))
+
+    search = new_search(pipelined=False, use_recognizer=not args.tesseract)
+    start = time.monotonic()
+    search.search_serially(args.bases)
+    serial_rate = args.bases * 60 / (time.monotonic() - start)
+
+    search = new_search(pipelined=True, use_recognizer=not args.tesseract)
+    pipeline = SearchPipeline(search)
+    start = time.monotonic()
+    pipeline.run(args.bases)
+    pipelined_rate = pipeline.bases * 60 / (time.monotonic() - start)
+
+    print(f"serial (this tree's loop): {serial_rate:6.1f} bases/min")
+    print(f"pipelined:                 {pipelined_rate:6.1f} bases/min ({pipelined_rate / serial_rate:.2f}x from pipelining)")
+    print(f"\n{'stage':<10} {'items':>6} {'median ms':>10} {'p95 ms':>8}")
+    for name, (count, median, p95) in pipeline.stage_summary().items():
+        print(f"{name:<10} {count:>6} {median:>10.1f} {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
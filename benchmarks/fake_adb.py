@@ -0,0 +1,67 @@
+"""
+Stand-in for the adb binary that replays recorded frames instead of talking to a device.
+
+The replay directory (FAKE_ADB_FRAMES) holds numbered captures: NNN.png as produced by
+`screencap -p` and NNN.raw as produced by plain `screencap`. Each screencap call returns
+the next frame in order, wrapping around at the end. An interactive `adb shell` runs a
+local sh with device-only commands such as `input` stubbed out; every other command
+succeeds silently.
+
+With FAKE_ADB_FRAME_TIME set, the replay follows the clock instead, like a device
+reacting to taps: every `input` command restarts the frames from the first one, each
+frame is shown for FAKE_ADB_FRAME_TIME seconds and the last one stays on screen.
+"""
+import os
+import subprocess
+import sys
+import time
+
+# Device commands accepted by the replay shell; input only marks the time of the tap
+SHELL_STUBS = b'input() { : > "$FAKE_ADB_FRAMES/.tap"; }\n'
+
+
+def next_frame(frames_dir: str, extension: str) -> bytes:
+    """Return the next recorded frame with the given extension, advancing the replay cursor."""
+    frames = sorted(f for f in os.listdir(frames_dir) if f.endswith(extension) and not f.startswith("."))
+    frame_time = float(os.environ.get("FAKE_ADB_FRAME_TIME") or 0)
+    if frame_time > 0:
+        try:
+            elapsed = time.time() - os.path.getmtime(os.path.join(frames_dir, ".tap"))
+        except FileNotFoundError:
+            elapsed = 0.0
+        with open(os.path.join(frames_dir, frames[min(int(elapsed / frame_time), len(frames) - 1)]), "rb") as f:
+            return f.read()
+    cursor_path = os.path.join(frames_dir, f".cursor{extension}")
+    try:
+        with open(cursor_path) as f:
+            cursor = int(f.read() or 0)
+    except FileNotFoundError:
+        cursor = 0
+    with open(cursor_path, "w") as f:
+        f.write(str(cursor + 1))
+    with open(os.path.join(frames_dir, frames[cursor % len(frames)]), "rb") as f:
+        return f.read()
+
+
+def main(args: list[str]) -> int:
+    # Ignore device selection, the replay stands in for every device
+    if args[:1] == ["-s"]:
+        args = args[2:]
+
+    if args[:2] == ["exec-out", "screencap"]:
+        extension = ".png" if "-p" in args[2:] else ".raw"
+        sys.stdout.buffer.write(next_frame(os.environ["FAKE_ADB_FRAMES"], extension))
+        sys.stdout.buffer.flush()
+    elif args == ["shell"]:
+        shell = subprocess.Popen(["sh"], stdin=subprocess.PIPE)
+        shell.stdin.write(SHELL_STUBS)
+        for line in sys.stdin.buffer:
+            shell.stdin.write(line)
+            shell.stdin.flush()
+        shell.stdin.close()
+        return shell.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
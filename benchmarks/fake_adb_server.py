@@ -0,0 +1,156 @@
+"""
+Stand-in for the adb server that speaks the smart-socket protocol over TCP.
+
+Serves the same replay corpus as fake_adb.py: exec:screencap returns recorded frames,
+shell: runs a local sh with device-only commands stubbed out, and sync: RECV reads
+local files. Used to exercise utils/adb_client.py end to end without a device.
+
+Usage:
+    python -m benchmarks.fake_adb_server --frames <replay frames dir> [--port 5037]
+"""
+import argparse
+import os
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_adb import SHELL_STUBS, next_frame
+
+
+class ADBRequestHandler(socketserver.BaseRequestHandler):
+    def recv_exactly(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client closed connection")
+            data += chunk
+        return bytes(data)
+
+    def reply(self, ok: bool, message: str = ""):
+        if ok:
+            self.request.sendall(b"OKAY")
+        else:
+            payload = message.encode()
+            self.request.sendall(b"FAIL" + b"%04x" % len(payload) + payload)
+
+    def handle(self):
+        try:
+            while True:
+                length = int(self.recv_exactly(4), 16)
+                request = self.recv_exactly(length).decode()
+                if request.startswith("host:transport"):
+                    self.reply(True)
+                elif request == "host:version":
+                    self.reply(True)
+                    self.request.sendall(b"0004" + b"0029")
+                    return
+                elif request.startswith("exec:"):
+                    self.reply(True)
+                    self.exec_command(request[len("exec:"):])
+                    return
+                elif request == "shell:":
+                    self.reply(True)
+                    self.interactive_shell()
+                    return
+                elif request.startswith("shell:"):
+                    self.reply(True)
+                    return
+                elif request == "sync:":
+                    self.reply(True)
+                    self.sync()
+                    return
+                else:
+                    self.reply(False, f"unknown service: {request}")
+                    return
+        except ConnectionError:
+            return
+
+    def exec_command(self, command: str):
+        args = command.split()
+        if args[:1] == ["screencap"]:
+            extension = ".png" if "-p" in args[1:] else ".raw"
+            self.request.sendall(next_frame(self.server.frames_dir, extension))
+
+    def interactive_shell(self):
+        shell = subprocess.Popen(["sh"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        shell.stdin.write(SHELL_STUBS)
+        shell.stdin.flush()
+
+        def forward_output():
+            for chunk in iter(lambda: shell.stdout.read1(65536), b""):
+                try:
+                    self.request.sendall(chunk)
+                except OSError:
+                    break
+            try:
+                self.request.shutdown(2)
+            except OSError:
+                pass
+
+        output_thread = threading.Thread(target=forward_output, daemon=True)
+        output_thread.start()
+        try:
+            for chunk in iter(lambda: self.request.recv(65536), b""):
+                shell.stdin.write(chunk)
+                shell.stdin.flush()
+        except OSError:
+            pass
+        if shell.poll() is None:
+            shell.kill()
+        shell.wait()
+        output_thread.join()
+
+    def sync(self):
+        while True:
+            command, length = self.recv_exactly(4), struct.unpack("<I", self.recv_exactly(4))[0]
+            if command == b"QUIT":
+                return
+            path = self.recv_exactly(length).decode()
+            if command != b"RECV":
+                message = f"unsupported sync command {command!r}".encode()
+                self.request.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+                return
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError as e:
+                message = str(e).encode()
+                self.request.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+                continue
+            for offset in range(0, len(data), 65536):
+                chunk = data[offset:offset + 65536]
+                self.request.sendall(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+            self.request.sendall(b"DONE" + struct.pack("<I", 0))
+
+
+class FakeADBServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, frames_dir: str, port: int = 0):
+        super().__init__(("127.0.0.1", port), ADBRequestHandler)
+        self.frames_dir = frames_dir
+
+    def start(self) -> int:
+        """Serve on a background thread and return the bound port."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.server_address[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay adb server")
+    parser.add_argument("--frames", required=True, help="Replay frames directory (NNN.png / NNN.raw)")
+    parser.add_argument("--port", type=int, default=5037)
+    args = parser.parse_args()
+
+    with FakeADBServer(args.frames, args.port) as server:
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
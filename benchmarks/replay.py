@@ -0,0 +1,69 @@
+"""Helpers for running the bot against benchmarks/fake_adb.py and a corpus of recorded frames."""
+import os
+import stat
+import struct
+import sys
+import tempfile
+
+import cv2
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_ADB = os.path.join(REPO_ROOT, "benchmarks", "fake_adb.py")
+
+# Full-resolution captures shipped with the repo, used when no corpus is given
+DEFAULT_FRAMES = [
+    os.path.join(REPO_ROOT, "result.png"),
+    os.path.join(REPO_ROOT, "troop_detection.png"),
+]
+
+
+def encode_raw(image) -> bytes:
+    """Encode a BGR image the way `screencap` does: 16 byte header then RGBA_8888 pixels."""
+    height, width = image.shape[:2]
+    rgba = cv2.cvtColor(image, cv2.COLOR_BGR2RGBA)
+    return struct.pack("<IIII", width, height, 1, 0) + rgba.tobytes()
+
+
+def build_replay(frame_paths: list[str], frame_time=None) -> str:
+    """
+    Write a replay directory for the given frames and put a fake adb first on PATH.
+    With frame_time, frames follow the clock and restart on every tap (see fake_adb.py).
+
+    Returns:
+        str: The replay directory (also exported as FAKE_ADB_FRAMES)
+    """
+    replay_dir = tempfile.mkdtemp(prefix="adb_replay_")
+    frames_dir = os.path.join(replay_dir, "frames")
+    bin_dir = os.path.join(replay_dir, "bin")
+    os.makedirs(frames_dir)
+    os.makedirs(bin_dir)
+
+    for i, path in enumerate(frame_paths):
+        image = cv2.imread(path)
+        if image is None:
+            raise FileNotFoundError(f"Could not read frame: {path}")
+        with open(os.path.join(frames_dir, f"{i:03d}.png"), "wb") as f:
+            f.write(cv2.imencode(".png", image)[1].tobytes())
+        with open(os.path.join(frames_dir, f"{i:03d}.raw"), "wb") as f:
+            f.write(encode_raw(image))
+
+    adb_path = os.path.join(bin_dir, "adb")
+    with open(adb_path, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_ADB}" "$@"\n')
+    os.chmod(adb_path, os.stat(adb_path).st_mode | stat.S_IEXEC)
+
+    if frame_time:
+        open(os.path.join(frames_dir, ".tap"), "w").close()
+    os.environ["FAKE_ADB_FRAME_TIME"] = str(frame_time or "")
+    os.environ["FAKE_ADB_FRAMES"] = frames_dir
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+    return replay_dir
+
+
+def start_fake_server(frames_dir: str) -> int:
+    """Start the stand-in adb server on a free port and point ADBClient at it."""
+    from benchmarks.fake_adb_server import FakeADBServer
+
+    port = FakeADBServer(frames_dir).start()
+    os.environ["ANDROID_ADB_SERVER_PORT"] = str(port)
+    return port
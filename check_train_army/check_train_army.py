@@ -12,8 +12,8 @@ from utils.debug_utils import DebugVisualizer
  
 class Checktrainarmy:
 
-    def __init__(self):
-        self.adb = ADBUtils()
+    def __init__(self, adb=None):
+        self.adb = adb or ADBUtils()
         self.image = ImageUtils()
         self.image_folder = os.path.join(os.path.dirname(__file__), "images")
         logging.info("\n" + "="*50)
@@ -26,30 +26,18 @@ class Checktrainarmy:
     def click_initial_buttons(self):
         self.image.find_and_click_image(self.adb, self.image_folder, "train_button.png", confidence_threshold=0.8)
     def check_army(self, max_attempts=1000, wait_time=10):
+        """Wait until troops, spells and heroes are all shown as ready (at most max_attempts * wait_time seconds)."""
         checks = ["troops.png", "spells.png", "heroes.png"]
-        
-        for attempt in range(max_attempts):
-            results = {}
+        logging.info(f"Waiting for {', '.join(checks)} (up to {max_attempts * wait_time}s)...")
 
-            for check in checks:
-                logging.info(f"Attempting to find {check} (Attempt {attempt + 1}/{max_attempts})...")
-                found = self.image.detect_image(self.adb, self.image_folder, check,confidence_threshold=0.8)
-
-                if found:
-                    logging.info(f"✅ Successfully found {check}")
-                else:
-                    logging.info(f"⏭️ {check} not found. Waiting {wait_time} seconds before retrying...")
-                
-                results[check] = found
-
-            # If all images are found, return True
-            if all(results.values()):
-                logging.info("✅ All troops, spells, and heroes are trained.")
-                return True
-
-            # Wait before trying again
-            time.sleep(wait_time)
+        # Polls quickly at first, then every wait_time seconds
+        found, _ = self.image.wait_for(self.adb, all_of=checks, image_folder=self.image_folder,
+                                       timeout=max_attempts * wait_time, confidence_threshold=0.8,
+                                       max_interval=wait_time)
+        logging.info(f"♻️ {self.image.matches_saved} template matches reused on unchanged screens")
+        if found:
+            logging.info("✅ All troops, spells, and heroes are trained.")
+            return True
 
         logging.info("❌ Training not completed within the allowed attempts.")
         return False
-
@@ -0,0 +1,108 @@
+"""
+Run the bot on several devices in parallel, one worker process per device serial.
+
+Each worker drives a single device through the normal start/attack/train/check cycle
+from main.py, with its own log file and its own working directory, so capture and
+debug files (screen.png, result.png, ocr_debug/, ...) are never shared between devices.
+The parent process supervises the workers and restarts any that stop.
+
+Usage:
+    python farm.py emulator-5554 emulator-5556
+    python farm.py --all
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%H:%M:%S'
+)
+
+def connected_devices() -> list[str]:
+    """List the serials of all devices adb reports as online."""
+    output = subprocess.run(["adb", "devices"], check=True, capture_output=True, text=True).stdout
+    return [line.split()[0] for line in output.splitlines()[1:] if line.strip().endswith("device")]
+
+def device_dir(farm_dir: str, serial: str) -> str:
+    """Per-device working directory (serials like 127.0.0.1:5555 are made path-safe)."""
+    return os.path.join(farm_dir, re.sub(r"[^\w.-]", "_", serial))
+
+def run_device(serial: str, farm_dir: str):
+    """Worker entry point: run the bot loop against one device."""
+    work_dir = device_dir(farm_dir, serial)
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(work_dir)
+    os.environ["ANDROID_SERIAL"] = serial
+    sys.path.insert(0, REPO_ROOT)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - {serial} - %(levelname)s - %(message)s',
+        datefmt='%H:%M:%S',
+        filename=os.path.join(work_dir, "bot.log"),
+        force=True
+    )
+
+    import main
+    main.run_bot()
+
+def start_worker(context, serial: str, farm_dir: str):
+    process = context.Process(target=run_device, args=(serial, farm_dir), name=f"farm-{serial}")
+    process.start()
+    logging.info(f"▶️ Started worker for {serial} (pid {process.pid}), logging to {device_dir(farm_dir, serial)}")
+    return process
+
+def supervise(serials: list[str], farm_dir: str, restart_delay=30):
+    """Start one worker per device and restart any worker that exits until interrupted."""
+    if len(serials) > (os.cpu_count() or 1):
+        logging.warning(f"⚠️ {len(serials)} devices on {os.cpu_count()} CPU cores, workers will compete for CPU")
+
+    context = multiprocessing.get_context("spawn")
+    workers = {serial: start_worker(context, serial, farm_dir) for serial in serials}
+    restart_at = {}
+
+    try:
+        while True:
+            time.sleep(1)
+            for serial, process in workers.items():
+                if process.is_alive():
+                    continue
+                if serial not in restart_at:
+                    logging.warning(f"⚠️ Worker for {serial} exited with code {process.exitcode}, restarting in {restart_delay}s")
+                    restart_at[serial] = time.monotonic() + restart_delay
+                elif time.monotonic() >= restart_at.pop(serial):
+                    workers[serial] = start_worker(context, serial, farm_dir)
+    except KeyboardInterrupt:
+        logging.info("🛑 Stopping farm...")
+    finally:
+        for process in workers.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        logging.info("✅ All workers stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot on several devices in parallel")
+    parser.add_argument("serials", nargs="*", help="Device serials to drive")
+    parser.add_argument("--all", action="store_true", help="Drive every device listed by 'adb devices'")
+    parser.add_argument("--farm-dir", default=os.path.join(REPO_ROOT, "farm"), help="Root for per-device logs and files")
+    args = parser.parse_args()
+
+    serials = list(dict.fromkeys(args.serials + (connected_devices() if args.all else [])))
+    if not serials:
+        parser.error("no devices given (pass serials or --all)")
+
+    logging.info(f"Starting farm with {len(serials)} device(s): {', '.join(serials)}")
+    supervise(serials, os.path.abspath(args.farm_dir))
+
+if __name__ == "__main__":
+    main()
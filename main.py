@@ -3,6 +3,10 @@ from train_sequence.training_sequence import TrainingSequence
 from search_sequence.search_sequence import SearchSequence
 from attack_sequence.attack_sequence import AttackSequence
 from check_train_army.check_train_army import Checktrainarmy
+from utils.adb_utils import ADBUtils
+from utils.debug_utils import configure_debug
+from utils.latency import get_latency_model
+from utils.telemetry import close_loot_telemetry
 import logging
 import time
 
@@ -13,21 +17,37 @@ logging.basicConfig(
     datefmt='%H:%M:%S'
 )
 
+# Debug images (debug/result.png, debug/troop_detection.png, debug/ocr_debug/): "off", "sampled", "on-failure" or "on"
+DEBUG_MODE = "on-failure"
+DEBUG_SAMPLE_EVERY = 20
+# Read loot with the built-in digit recognizer before Tesseract; leave off until
+# `python -m benchmarks.bench_ocr` shows it matching Tesseract on held-out loot crops
+USE_DIGIT_RECOGNIZER = False
+
 def main():
     logging.info("\n" + "="*70)
     logging.info("STARTING CLASH OF CLANS ASSISTANT")
     logging.info("="*70 + "\n")
 
-    # Initialize sequences
-    start_sequence = StartingSequence()
-    train_sequence = TrainingSequence()
+    run_bot()
+
+def run_bot():
+    """Run the start/attack/train/check cycle until interrupted."""
+    configure_debug(DEBUG_MODE, DEBUG_SAMPLE_EVERY)
+
+    # Initialize sequences, sharing one device connection
+    adb = ADBUtils()
+    start_sequence = StartingSequence(adb=adb)
+    train_sequence = TrainingSequence(adb=adb)
     search_sequence = SearchSequence(
         gold_threshold=1000000,
         elixir_threshold=1000000,
-        dark_threshold=5000
+        dark_threshold=5000,
+        adb=adb,
+        use_recognizer=USE_DIGIT_RECOGNIZER
     )
-    attack_sequence = AttackSequence(target_percentage=50)
-    check_train_army = Checktrainarmy()
+    attack_sequence = AttackSequence(target_percentage=50, adb=adb)
+    check_train_army = Checktrainarmy(adb=adb)
 
     logging.info("Initialized with thresholds:")
     logging.info(f"  Gold:   {search_sequence.gold_threshold:,}")
@@ -83,6 +103,13 @@ def main():
         logging.error(f"❌ Error: {e}")
     finally:
         train_sequence.cleanup()
+        adb.close()
+        close_loot_telemetry()
+        latency = get_latency_model()
+        latency.save()
+        for transition, (count, timeouts, median, p95) in sorted(latency.summary().items()):
+            logging.info(f"⏱️ {transition}: median {median:.2f}s, p95 {p95:.2f}s over {count} samples "
+                         f"({timeouts} timed out)")
         logging.info("\n" + "="*70)
         logging.info("✅ ASSISTANT STOPPED CLEANLY")
         logging.info("="*70)
@@ -0,0 +1,259 @@
+"""
+Pipelined base search.
+
+The serial search loop waits for a base, reads its loot, decides and taps next, one step
+after the other. SearchPipeline runs the same steps as stages on their own threads,
+connected by small bounded queues:
+
+    capture -> crop -> recognize -> decide -> act
+
+Capture restarts the moment the next tap is sent, so frames of the new base are being
+taken while the tap's human-like pause runs. Crop drops frames taken before the tap and
+the lingering old base, waits for the loot counters to settle and finds the next button
+on that same frame, so act taps it without another screenshot or match. Every decision
+is streamed to the listeners once it is acted on: act reads the loot the lazy reads
+skipped after the tap, while the next base loads. Bases per minute and per-stage
+latency are logged when the search ends.
+"""
+import collections
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class SearchPipeline:
+    """Runs SearchSequence's search loop as concurrent stages (see the module docstring)."""
+
+    def __init__(self, search, next_threshold=0.7, listeners=()):
+        """
+        Args:
+            search: SearchSequence providing the device, templates, OCR and thresholds
+            next_threshold: Match confidence for the next button
+            listeners: Callables receiving a dict per decided base (see decide)
+        """
+        self.search = search
+        self.adb = search.adb
+        self.image = search.image
+        self.next_button = self.image.get_template("next_button.png", search.image_folder)
+        self.next_threshold = next_threshold
+        self.listeners = list(listeners)
+
+        self.frames = queue.Queue(maxsize=2)
+        self.crops = queue.Queue(maxsize=1)
+        self.readings = queue.Queue(maxsize=1)
+        self.actions = queue.Queue(maxsize=1)
+
+        self.running = False
+        self.found = False
+        self.max_searches = 0
+        # Set while a base is awaited: capture runs and crop forwards the settled frame
+        self.awaiting_base = threading.Event()
+        self.base_started = 0.0  # time.monotonic() of the tap that brought up the awaited base
+        self.timeout = 10.0
+        self.bases = 0
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=1000))
+
+    def run(self, max_searches=30000) -> bool:
+        """
+        Search until a base meets the thresholds or max_searches bases were skipped.
+
+        Returns:
+            bool: True if a base to attack is on screen
+        """
+        self.max_searches = max_searches
+        self.running = True
+        self.found = False
+        self.bases = 0
+        self.timeout = self.image.latency.timeout("loot settled", default=10)
+        self.await_base(time.monotonic(), departed=self.search.loot_frame)
+
+        stages = [
+            ("capture", self.capture_loop),
+            ("crop", lambda: self.stage("crop", self.frames, self.crop, self.crops)),
+            ("recognize", lambda: self.stage("recognize", self.crops, self.recognize, self.readings)),
+            ("decide", lambda: self.stage("decide", self.readings, self.decide, self.actions)),
+            ("act", lambda: self.stage("act", self.actions, self.act, None)),
+        ]
+        threads = [threading.Thread(target=target, name=f"search-{name}", daemon=True) for name, target in stages]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        try:
+            while self.running:
+                time.sleep(0.1)
+        finally:
+            self.stop()
+            for thread in threads:
+                thread.join(timeout=5)
+            self.log_summary(time.monotonic() - started)
+        return self.found
+
+    def stop(self):
+        self.running = False
+        self.awaiting_base.set()  # Wake up capture so it sees the stop
+
+    def await_base(self, started: float, departed=None):
+        """Start waiting for a new base brought up at `started`."""
+        self.search.loot_settle.reset(departed=departed)
+        self.base_started = started
+        self.awaiting_base.set()
+
+    def record(self, stage: str, seconds: float):
+        self.latencies[stage].append(seconds)
+
+    def put(self, outbox, item):
+        """Put an item on a bounded queue, giving up if the pipeline stops while it is full."""
+        while self.running:
+            try:
+                outbox.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def stage(self, name: str, inbox, work, outbox):
+        """Apply work to every item of inbox, passing results that are not None to outbox."""
+        while self.running:
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            started = time.monotonic()
+            try:
+                result = work(item)
+            except Exception as e:
+                logging.error(f"❌ Search {name} stage failed: {e}")
+                # Same recovery as the serial loop: move on to the next base
+                result = None
+                if name != "act":
+                    self.awaiting_base.clear()
+                    self.put(self.actions, (None, None, None, None))
+            self.record(name, time.monotonic() - started)
+            if result is not None and outbox is not None:
+                self.put(outbox, result)
+
+    def capture_loop(self):
+        """Capture frames while a base is awaited, keeping only the freshest ones queued."""
+        while self.running:
+            if not self.awaiting_base.wait(timeout=0.1) or not self.running:
+                continue
+            started = time.monotonic()
+            frame = self.adb.capture_frame()
+            self.record("capture", time.monotonic() - started)
+            if frame is None:
+                time.sleep(0.5)
+                continue
+            try:
+                self.frames.put_nowait(frame)
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
+                self.frames.put_nowait(frame)
+
+    def crop(self, frame):
+        """Forward the first settled frame of the awaited base with its loot regions and next button."""
+        if not self.awaiting_base.is_set() or frame.timestamp < self.base_started:
+            return None
+        waited = frame.timestamp - self.base_started
+        shown = self.next_button is not None and self.image.is_shown(frame, self.next_button, self.next_threshold)
+        settled = self.search.loot_settle(frame)
+        if not (shown and settled):
+            if waited < self.timeout:
+                return None
+            logging.warning("⚠️ Loot numbers did not settle, reading the last frame")
+            self.image.latency.record("loot settled", waited, timed_out=True)
+        else:
+            self.image.latency.record("loot settled", waited)
+
+        self.awaiting_base.clear()
+        button = None
+        if shown:
+            position, _ = self.image.locate(frame, self.next_button, self.next_threshold)
+            button = self.next_button.center(position)
+        regions = {'gold': frame.roi(self.search.gold_bbox),
+                   'elixir': frame.roi(self.search.elixir_bbox),
+                   'dark': frame.roi(self.search.dark_bbox)}
+        return frame, regions, button
+
+    def recognize(self, item):
+        frame, regions, button = item
+        amounts = self.search.read_resources(regions)
+        return frame, regions, button, amounts, self.search.read_confidence
+
+    def decide(self, item):
+        """Apply the 2-of-3 rule, stream the result and stop on a base worth attacking."""
+        frame, regions, button, amounts, confidence = item
+        search = self.search
+        search.loot_frame = frame
+        gold, elixir, dark = amounts.get('gold'), amounts.get('elixir'), amounts.get('dark')
+        resources_met = search.count_resources_met(gold, elixir, dark)
+        attack = resources_met >= 2
+        skipped = len(regions) - len(amounts)
+        search.reads_skipped += skipped
+        search.bases_evaluated += 1
+        self.bases += 1
+
+        record = {
+            'timestamp': time.time(),
+            'gold': gold, 'elixir': elixir, 'dark': dark,
+            'confidence': confidence,
+            'decision': "ATTACK" if attack else "SKIP",
+            'seconds': time.monotonic() - self.base_started,
+            'reads_skipped': skipped,
+        }
+        logging.info(f"Base {self.bases}: Gold {gold}, Elixir {elixir}, Dark {dark} | "
+                     f"{resources_met}/3 thresholds | {record['decision']} ({record['seconds']:.2f}s)")
+        if search.debugger.sink.enabled:
+            search.save_resource_debug(frame, (gold, elixir, dark), resources_met, regions)
+
+        if attack:
+            logging.info(f"BASE FOUND - {resources_met}/3 THRESHOLDS MET - ATTACKING!")
+            self.found = True
+            self.stop()
+            self.emit(record, regions)
+            return None
+        if self.bases >= self.max_searches:
+            logging.info(f"SEARCH COMPLETE - Max attempts ({self.max_searches}) reached")
+            self.stop()
+            self.emit(record, regions)
+            return None
+        return frame, button, record, regions
+
+    def emit(self, record: dict, regions):
+        """Pass a decided base to the listeners, reading the loot its decision skipped first."""
+        if not self.listeners:
+            return
+        self.search.complete_base(record, regions)
+        for listener in self.listeners:
+            listener(record)
+
+    def act(self, item):
+        """Tap next where the button was found, then record the base while the new one loads."""
+        frame, button, record, regions = item
+        if button is None:
+            # Button not located on the frame (or a stage failed): look for it on a new capture
+            if self.adb.capture_frame() is not None:
+                self.search.click_skip_button()
+            self.await_base(time.monotonic(), departed=frame)
+        else:
+            # Capture restarts right away; frames still showing the old base are ignored
+            self.await_base(time.monotonic(), departed=frame)
+            self.adb.humanlike_click(*button)
+        if record is not None:
+            self.emit(record, regions)
+        return None
+
+    def stage_summary(self) -> dict:
+        """{stage: (item count, median ms, p95 ms)}"""
+        return {name: (len(samples), 1000 * float(np.median(samples)), 1000 * float(np.percentile(samples, 95)))
+                for name, samples in self.latencies.items() if samples}
+
+    def log_summary(self, elapsed: float):
+        rate = self.bases * 60 / elapsed if elapsed > 0 else 0.0
+        logging.info(f"🔎 Searched {self.bases} bases in {elapsed:.1f}s ({rate:.1f} bases/min)")
+        for name, (count, median, p95) in self.stage_summary().items():
+            logging.info(f"  {name:<10} median {median:7.1f} ms, p95 {p95:7.1f} ms over {count}")
@@ -1,30 +1,64 @@
+import itertools
 import os
 import time
 import logging
 import cv2
 import numpy as np
-import pytesseract
 
 from utils.image_utils import ImageUtils
 from utils.adb_utils import ADBUtils
 from utils.debug_utils import DebugVisualizer
+from utils.ocr import DigitRecognizer, get_tesseract_engine, tesseract_digits
+from utils.screen_state import ScreenClassifier, ATTACK_MENU
+from utils.settle import RegionSettle
+from utils.telemetry import get_loot_telemetry
+from search_sequence.search_pipeline import SearchPipeline
+
+# Loot number boxes on the scouting screen (x1, y1, x2, y2)
+LOOT_BBOXES = {
+    'gold': (95, 95, 220, 120),  # Top left region - Gold
+    'elixir': (95, 135, 220, 160),  # Top center region - Elixir
+    'dark': (95, 175, 200, 200),  # Top right region - Dark Elixir
+}
 
 
 class SearchSequence:
-    def __init__(self, gold_threshold, elixir_threshold, dark_threshold):
-        self.adb = ADBUtils()
+    def __init__(self, gold_threshold, elixir_threshold, dark_threshold, adb=None, pipelined=True,
+                 use_recognizer=False):
+        self.adb = adb or ADBUtils()
         self.image = ImageUtils()
+        self.screen = ScreenClassifier(self.adb, self.image)
         self.image_folder = os.path.join(os.path.dirname(__file__), "images")
         self.gold_threshold = gold_threshold
         self.elixir_threshold = elixir_threshold
         self.dark_threshold = dark_threshold
+        # Run the search as concurrent capture/recognize/act stages (SearchPipeline)
+        self.pipelined = pipelined
+        # Read loot with the digit recognizer before Tesseract; off until benchmarks/bench_ocr
+        # shows it matching Tesseract on loot crops from several scouted bases
+        self.use_recognizer = use_recognizer
 
         # Wider bounding boxes for resource detection (x1, y1, x2, y2)
-        self.gold_bbox = (95, 95, 220, 120)  # Top left region - Gold
-        self.elixir_bbox = (95, 135, 220, 160)  # Top center region - Elixir
-        self.dark_bbox = (95, 175, 200, 200)  # Top right region - Dark Elixir
+        self.gold_bbox = LOOT_BBOXES['gold']
+        self.elixir_bbox = LOOT_BBOXES['elixir']
+        self.dark_bbox = LOOT_BBOXES['dark']
+
+        # Loot numbers count up after a base loads; OCR waits until they stop changing
+        self.loot_settle = RegionSettle([self.gold_bbox, self.elixir_bbox, self.dark_bbox])
+        self.loot_frame = None  # Frame the last loot was read from
 
         self.debugger = DebugVisualizer()
+        self.digits = DigitRecognizer()
+        # Started now so the Tesseract mode is logged at startup, not at the first unsure read
+        self.tesseract = get_tesseract_engine()
+        self.ocr_fallbacks = 0  # Loot numbers the digit recognizer left to Tesseract
+        # [threshold passes, reads] per resource, to read the most decisive ones first
+        self.loot_history = {'gold': [0, 0], 'elixir': [0, 0], 'dark': [0, 0]}
+        self.reads_skipped = 0  # Loot numbers not read because the decision was already settled
+        self.bases_evaluated = 0
+        self.read_confidence = None  # Lowest recognizer confidence among the last numbers read
+        # Called with a dict per decided base (see SearchPipeline.decide); records loot telemetry
+        self.base_listeners = [get_loot_telemetry(self.adb.serial).record]
         logging.info(f"Search sequence initialized with thresholds - G:{gold_threshold}, E:{elixir_threshold}, D:{dark_threshold}")
 
     def click_initial_buttons(self):
@@ -42,7 +76,6 @@ class SearchSequence:
                     break  # Exit retry loop
                 else:
                     logging.warning("⚠️ Attack menu not detected after click, retrying...")
-                    time.sleep(1)  # Short wait before retrying
 
             else:
                 logging.warning(f"⚠️ Could not find 'attack_button.png' on attempt {attempt + 1}")
@@ -51,24 +84,48 @@ class SearchSequence:
         for attempt in range(3):  # Try up to 3 times
             logging.info(f"Attempting to click 'find_match.png' (attempt {attempt + 1}/3)")
 
-            if self.image.detect_image(self.adb, self.image_folder, "find_match.png"):
-                if self.image.find_and_click_image(self.adb, self.image_folder, "find_match.png", confidence_threshold=0.6):
+            found, frame = self.image.wait_for(self.adb, any_of=["find_match.png"], image_folder=self.image_folder,
+                                               timeout=self.image.latency.timeout("find_match.png", default=1))
+            if found:
+                if self.image.find_and_click_image(self.adb, self.image_folder, "find_match.png", confidence_threshold=0.6, frame=frame):
                     logging.info("✅ Successfully clicked 'find_match.png'")
-                    logging.info("⏳ Waiting for resources to load...")
-                    time.sleep(3)  # Reduced from 3.5s
                     break  # Exit loop once successful
             else:
                 logging.warning(f"🚫 'find_match.png' not found on attempt {attempt + 1}, retrying...")
-                time.sleep(1)  # Short wait before retrying
 
-        # Short delay to ensure UI stability
+        # Wait until matchmaking found the first base (next button shown);
+        # extract_resource_amounts then waits for its loot numbers to settle
         logging.info("⏳ Waiting for resources to appear...")
-        time.sleep(2)
-
+        self.image.wait_for(self.adb, any_of=["next_button.png"], image_folder=self.image_folder,
+                            timeout=self.image.latency.timeout("next_button.png", default=15))
+
+
+    def wait_for_loot(self, timeout=None):
+        """
+        Wait until a base is shown and its loot numbers stopped counting up.
+
+        The base counts as shown once the next button is (it is absent while clouds cover
+        the screen) and the loot differs from the base read last, and the numbers as settled
+        once the three loot regions stayed unchanged for a few frames. On timeout the last
+        frame is returned so the search carries on.
+
+        Returns:
+            Frame: The frame to read the loot from (None if capture failed)
+        """
+        if timeout is None:
+            timeout = self.image.latency.timeout("loot settled", default=10)
+        self.loot_settle.reset(departed=self.loot_frame)
+        settled, frame = self.image.wait_for(self.adb, any_of=[self.loot_settle], all_of=["next_button.png"],
+                                             image_folder=self.image_folder, timeout=timeout,
+                                             transition="loot settled")
+        if settled is None:
+            logging.warning("⚠️ Loot numbers did not settle, reading the last frame")
+        return frame
 
     def verify_attack_menu(self):
-        """Verify we're in the attack menu by looking for the find_match button"""
-        return self.image.detect_image(self.adb, self.image_folder, "find_match.png", confidence_threshold=0.6)
+        """Verify we're in the attack menu (find_match button visible), waiting briefly for it to open"""
+        found, _ = self.image.wait_for(self.adb, any_of=[lambda frame: self.screen.is_screen(frame, ATTACK_MENU)], timeout=1)
+        return found is not None
 
     def preprocess_for_ocr(self, img):
         """Simplified preprocessing: only invert the image"""
@@ -78,44 +135,73 @@ class SearchSequence:
         # Invert the image (white text on black background)
         inverted = cv2.bitwise_not(gray)
 
-        # Save intermediate steps for debugging
-        debug_folder = "ocr_debug"
-        os.makedirs(debug_folder, exist_ok=True)
-        cv2.imwrite(f"{debug_folder}/0_original.png", img)
-        cv2.imwrite(f"{debug_folder}/1_gray.png", gray)
-        cv2.imwrite(f"{debug_folder}/2_inverted.png", inverted)
-
         return inverted
 
     def try_multiple_ocr(self, img):
         """Enhanced OCR with custom-trained digits model"""
-        # Save preprocessed image for manual verification
-        cv2.imwrite("ocr_debug/last_ocr_input.png", img)
-
-        # Use custom digits-trained config
-        custom_config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789'
-
-        # Try multiple approaches
-        results = []
-        try:
-            # Attempt with custom traineddata if available
-            results.append(pytesseract.image_to_string(img, config=custom_config, lang='digits'))
-        except:
-            # Fallback to default
-            results.append(pytesseract.image_to_string(img, config=custom_config))
-
-        # Alternative PSM modes
-        for psm in [8, 13]:
-            results.append(pytesseract.image_to_string(
-                img,
-                config=f'--oem 3 --psm {psm} -c tessedit_char_whitelist=0123456789'
-            ))
-
-        # Select the most frequent valid result
-        valid_results = [r.strip() for r in results if any(c.isdigit() for c in r)]
-        if valid_results:
-            return max(set(valid_results), key=valid_results.count)
-        return ""
+        return tesseract_digits(img)
+
+    def read_order(self) -> list:
+        """
+        Resources in the order to read them: the pair whose pass/fail outcomes most often
+        agree historically comes first, since two agreeing reads settle the 2-of-3 rule.
+        """
+        rates = {name: (passes + 1) / (reads + 2) for name, (passes, reads) in self.loot_history.items()}
+        agree = lambda a, b: rates[a] * rates[b] + (1 - rates[a]) * (1 - rates[b])
+        first, second = max(itertools.combinations(rates, 2), key=lambda pair: agree(*pair))
+        return [first, second] + [name for name in rates if name not in (first, second)]
+
+    def decision_settled(self, amounts: dict) -> bool:
+        """True once the resources read so far decide the 2-of-3 rule whatever the others show."""
+        thresholds = self.resource_thresholds()
+        met = sum(1 for name, amount in amounts.items() if amount >= thresholds[name])
+        unread = len(thresholds) - len(amounts)
+        return met >= 2 or met + unread < 2
+
+    def resource_thresholds(self) -> dict:
+        return {'gold': self.gold_threshold, 'elixir': self.elixir_threshold, 'dark': self.dark_threshold}
+
+    def read_resources(self, regions) -> dict:
+        """
+        Read loot numbers lazily in read_order(), stopping once the decision is settled.
+        The two most decisive numbers are read first and the third only if they leave the
+        decision open. Tesseract reads each step in one batch; with use_recognizer the
+        digit recognizer reads first and Tesseract only gets the numbers it is unsure about.
+
+        Returns:
+            dict: {resource name: amount} for the resources that were read
+        """
+        amounts = {}
+        confidences = []
+        order = self.read_order()
+        for step in (order[:2], order[2:]):
+            if self.decision_settled(amounts):
+                break
+            unsure = []
+            for name in step:
+                if not self.use_recognizer:
+                    unsure.append(name)
+                    continue
+                text, confidence = self.digits.recognize(regions[name])
+                confidences.append(confidence)
+                if self.digits.is_confident(confidence):
+                    amounts[name] = self.extract_number(text)
+                else:
+                    logging.info(f"Digit recognizer unsure about {name} ('{text}', {confidence:.2f}), using Tesseract")
+                    unsure.append(name)
+            if unsure and not self.decision_settled(amounts):
+                if self.use_recognizer:
+                    self.ocr_fallbacks += len(unsure)
+                lines = self.tesseract.read_lines([self.preprocess_for_ocr(regions[name]) for name in unsure])
+                amounts.update({name: self.extract_number(line) for name, line in zip(unsure, lines)})
+        self.read_confidence = min(confidences) if confidences else None
+
+        thresholds = self.resource_thresholds()
+        for name, amount in amounts.items():
+            history = self.loot_history[name]
+            history[0] += amount >= thresholds[name]
+            history[1] += 1
+        return amounts
 
     def extract_number(self, text):
         """Improved validation with game-specific checks"""
@@ -133,22 +219,21 @@ class SearchSequence:
 
         return num
 
-    def extract_resource_amounts(self) -> tuple[int, int, int]:
-        """Enhanced extraction with region verification"""
-        logging.info("Taking screenshot for resource detection")
-        time.sleep(3)
-        if not self.adb.take_screenshot("screen.png"):
-            return 0, 0, 0
-
-        self.debugger.load_screenshot("screen.png")
-        screenshot = cv2.imread("screen.png")
-        if screenshot is None:
+    def extract_resource_amounts(self, frame=None) -> tuple[int | None, int | None, int | None]:
+        """
+        Enhanced extraction with region verification (captures a new Frame if none is given).
+        Resources left unread because the 2-of-3 decision was already settled are None.
+        """
+        if frame is None:
+            frame = self.wait_for_loot()
+        if frame is None:
             return 0, 0, 0
+        self.loot_frame = frame
 
         # Extract regions for OCR
-        gold_region = screenshot[self.gold_bbox[1]:self.gold_bbox[3], self.gold_bbox[0]:self.gold_bbox[2]]
-        elixir_region = screenshot[self.elixir_bbox[1]:self.elixir_bbox[3], self.elixir_bbox[0]:self.elixir_bbox[2]]
-        dark_region = screenshot[self.dark_bbox[1]:self.dark_bbox[3], self.dark_bbox[0]:self.dark_bbox[2]]
+        gold_region = frame.roi(self.gold_bbox)
+        elixir_region = frame.roi(self.elixir_bbox)
+        dark_region = frame.roi(self.dark_bbox)
 
         # Verify region sizes
         for name, region in [('gold', gold_region),
@@ -158,129 +243,97 @@ class SearchSequence:
                 logging.error(f"Invalid {name} region size: {region.shape}")
                 return 0, 0, 0
 
-        # Process each region
-        gold_text = self.try_multiple_ocr(self.preprocess_for_ocr(gold_region))
-        elixir_text = self.try_multiple_ocr(self.preprocess_for_ocr(elixir_region))
-        dark_text = self.try_multiple_ocr(self.preprocess_for_ocr(dark_region))
+        # Read the regions lazily, most decisive first
+        regions = {'gold': gold_region, 'elixir': elixir_region, 'dark': dark_region}
+        amounts = self.read_resources(regions)
+        gold, elixir, dark = amounts.get('gold'), amounts.get('elixir'), amounts.get('dark')
+
+        skipped = len(regions) - len(amounts)
+        self.reads_skipped += skipped
+        self.bases_evaluated += 1
 
-        logging.info(f"OCR results - Gold: '{gold_text}', Elixir: '{elixir_text}', Dark: '{dark_text}'")
+        resources_met = self.count_resources_met(gold, elixir, dark)
+        meets = resources_met >= 2  # At least 2 resources must meet thresholds
+        decision = "ATTACK" if meets else "SKIP"
 
-        gold = self.extract_number(gold_text)
-        elixir = self.extract_number(elixir_text)
-        dark = self.extract_number(dark_text)
+        if self.debugger.sink.enabled:
+            self.save_resource_debug(frame, (gold, elixir, dark), resources_met, regions)
 
-        # Draw visualization of detection areas with confidence information
-        gold_meets = gold >= self.gold_threshold
-        elixir_meets = elixir >= self.elixir_threshold
-        dark_meets = dark >= self.dark_threshold
+        logging.info(f"Resources - Gold: {gold}, Elixir: {elixir}, Dark: {dark} | Decision: {decision}")
+
+        logging.info(f"Resource detection results:")
+        for label, amount, threshold in [("Gold", gold, self.gold_threshold),
+                                         ("Elixir", elixir, self.elixir_threshold),
+                                         ("Dark", dark, self.dark_threshold)]:
+            if amount is None:
+                logging.info(f"  {label + ' detected:':<17}skipped")
+            else:
+                logging.info(f"  {label + ' detected:':<17}{amount:,} {'✓' if amount >= threshold else '✗'}")
+        logging.info(f"⏭️ Skipped {skipped}/{len(regions)} loot reads "
+                     f"({self.reads_skipped} over {self.bases_evaluated} bases)")
+
+        return gold, elixir, dark
+
+    def save_resource_debug(self, frame, amounts, resources_met, regions):
+        """Visualize the resource detection; OCR crops are saved alongside when the visualization is recorded"""
+        gold, elixir, dark = amounts
+        meets = resources_met >= 2
+        self.debugger.load_screenshot(frame)
 
         # Move text to the right side of the resource boxes
         text_offset_x = 210  # X-coordinate for text (right side of the resource boxes)
         text_offset_y = 30   # Y-coordinate spacing between lines
 
-        # Gold text
-        self.debugger.draw_detection(
-            self.gold_bbox[:2],
-            (self.gold_bbox[2] - self.gold_bbox[0], self.gold_bbox[3] - self.gold_bbox[1]),
-            "",
-            color=(0, 255, 0) if gold_meets else (0, 0, 255)
-        )
-        cv2.putText(
-            self.debugger.current_visualization,
-            f"Gold: {gold:,} {'✓' if gold_meets else '✗'}",
-            (text_offset_x, self.gold_bbox[1] + text_offset_y),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.6,
-            (0, 255, 0) if gold_meets else (0, 0, 255),
-            2
-        )
-
-        # Elixir text
-        self.debugger.draw_detection(
-            self.elixir_bbox[:2],
-            (self.elixir_bbox[2] - self.elixir_bbox[0], self.elixir_bbox[3] - self.elixir_bbox[1]),
-            "",
-            color=(0, 255, 0) if elixir_meets else (0, 0, 255)
-        )
-        cv2.putText(
-            self.debugger.current_visualization,
-            f"Elixir: {elixir:,} {'✓' if elixir_meets else '✗'}",
-            (text_offset_x, self.elixir_bbox[1] + text_offset_y),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.6,
-            (0, 255, 0) if elixir_meets else (0, 0, 255),
-            2
-        )
-
-        # Dark text
-        self.debugger.draw_detection(
-            self.dark_bbox[:2],
-            (self.dark_bbox[2] - self.dark_bbox[0], self.dark_bbox[3] - self.dark_bbox[1]),
-            "",
-            color=(0, 255, 0) if dark_meets else (0, 0, 255)
-        )
-        cv2.putText(
-            self.debugger.current_visualization,
-            f"Dark: {dark:,} {'✓' if dark_meets else '✗'}",
-            (text_offset_x, self.dark_bbox[1] + text_offset_y),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.6,
-            (0, 255, 0) if dark_meets else (0, 0, 255),
-            2
-        )
+        for label, bbox, amount, threshold in [("Gold", self.gold_bbox, gold, self.gold_threshold),
+                                               ("Elixir", self.elixir_bbox, elixir, self.elixir_threshold),
+                                               ("Dark", self.dark_bbox, dark, self.dark_threshold)]:
+            if amount is None:
+                color = (160, 160, 160)
+                text = f"{label}: skipped"
+            else:
+                amount_meets = amount >= threshold
+                color = (0, 255, 0) if amount_meets else (0, 0, 255)
+                text = f"{label}: {amount:,} {'✓' if amount_meets else '✗'}"
+            self.debugger.draw_detection(bbox[:2], (bbox[2] - bbox[0], bbox[3] - bbox[1]), "", color=color)
+            self.debugger.draw_text(
+                text,
+                (text_offset_x, bbox[1] + text_offset_y),
+                0.6,
+                color,
+                2
+            )
 
-        # Add thresholds info
-        cv2.putText(
-            self.debugger.current_visualization,
+        # Add thresholds info and overall status
+        self.debugger.draw_text(
             f"Thresholds - G:{self.gold_threshold} E:{self.elixir_threshold} D:{self.dark_threshold}",
-            (text_offset_x, self.debugger.current_visualization.shape[0] - 60),
-            cv2.FONT_HERSHEY_SIMPLEX,
+            (text_offset_x, frame.height - 60),
             0.6,
             (255, 255, 255),
             1
         )
-
-        # Count resources that meet thresholds
-        resources_met = sum([
-            1 if gold >= self.gold_threshold else 0,
-            1 if elixir >= self.elixir_threshold else 0,
-            1 if dark >= self.dark_threshold else 0
-        ])
-        meets = resources_met >= 2  # At least 2 resources must meet thresholds
-
-        # Add overall status to visualization
-        cv2.putText(
-            self.debugger.current_visualization,
+        self.debugger.draw_text(
             f"Criteria: {resources_met}/3 thresholds met (need 2+)",
-            (text_offset_x, self.debugger.current_visualization.shape[0] - 90),
-            cv2.FONT_HERSHEY_SIMPLEX,
+            (text_offset_x, frame.height - 90),
             0.6,
             (255, 255, 255) if not meets else (0, 255, 0),
             1
         )
-
-        # Update the decision text
-        decision = "ATTACK" if meets else "SKIP"
-        self.debugger.current_visualization = cv2.putText(
-            self.debugger.current_visualization,
-            decision,
-            (text_offset_x, self.debugger.current_visualization.shape[0] - 30),
-            cv2.FONT_HERSHEY_SIMPLEX,
+        self.debugger.draw_text(
+            "ATTACK" if meets else "SKIP",
+            (text_offset_x, frame.height - 30),
             1.5,
             (0, 255, 0) if meets else (0, 0, 255),
             4
         )
 
-        self.debugger.save_visualization("result.png")
-
-        logging.info(f"Resources - Gold: {gold}, Elixir: {elixir}, Dark: {dark} | Decision: {decision}")
-
-        logging.info(f"Resource detection results:")
-        logging.info(f"  Gold detected:   {gold:,} {'✓' if gold >= self.gold_threshold else '✗'}")
-        logging.info(f"  Elixir detected: {elixir:,} {'✓' if elixir >= self.elixir_threshold else '✗'}")
-        logging.info(f"  Dark detected:   {dark:,} {'✓' if dark >= self.dark_threshold else '✗'}")
-
-        return gold, elixir, dark
+        # A resource that read as 0 means OCR failed on it
+        if self.debugger.save_visualization("result.png", failed=0 in amounts):
+            debug_folder = os.path.join(self.debugger.output_dir, "ocr_debug")
+            sink = self.debugger.sink
+            for name, region in regions.items():
+                sink.submit_image(f"{debug_folder}/{name}_0_original.png", region)
+                sink.submit(f"{debug_folder}/{name}_1_gray.png", cv2.cvtColor, region, cv2.COLOR_BGR2GRAY)
+                sink.submit(f"{debug_folder}/{name}_2_inverted.png", self.preprocess_for_ocr, region)
 
     def click_skip_button(self):
         """Click the next/skip button to move to the next base"""
@@ -292,22 +345,19 @@ class SearchSequence:
         else:
             logging.warning("Could not find next/skip button - search may be interrupted")
 
-    def meets_threshold(self, gold: int, elixir: int, dark: int) -> bool:
+    def count_resources_met(self, gold: int | None, elixir: int | None, dark: int | None) -> int:
+        """Number of resources meeting their threshold; unread (None) resources count as not met"""
+        return sum(
+            1 for amount, threshold in [(gold, self.gold_threshold),
+                                        (elixir, self.elixir_threshold),
+                                        (dark, self.dark_threshold)]
+            if amount is not None and amount >= threshold
+        )
+
+    def meets_threshold(self, gold: int | None, elixir: int | None, dark: int | None) -> bool:
         """Check if at least TWO resources meet or exceed the defined thresholds"""
-        # Count how many resources meet their thresholds
-        resources_met = 0
-        
-        if gold >= self.gold_threshold:
-            resources_met += 1
-        
-        if elixir >= self.elixir_threshold:
-            resources_met += 1
-        
-        if dark >= self.dark_threshold:
-            resources_met += 1
-        
-        # Return True if at least 2 resources meet thresholds
-        return resources_met >= 2
+        # Unread resources were skipped only once the other two settled the decision
+        return self.count_resources_met(gold, elixir, dark) >= 2
 
     def reset_search_state(self):
         """Reset the search state to prepare for a new search sequence"""
@@ -333,6 +383,61 @@ class SearchSequence:
             # Add recovery attempt here
             return False
 
+        if self.pipelined:
+            return SearchPipeline(self, listeners=self.base_listeners).run(max_searches)
+        return self.search_serially(max_searches)
+
+    def record_base(self, amounts, decision, seconds):
+        """Pass one decided base to the base listeners, with the loot the lazy reads skipped read from loot_frame"""
+        gold, elixir, dark = amounts
+        base = {
+            'timestamp': time.time(),
+            'gold': gold, 'elixir': elixir, 'dark': dark,
+            'confidence': self.read_confidence,
+            'decision': decision,
+            'seconds': seconds,
+            'reads_skipped': sum(amount is None for amount in amounts),
+        }
+        if base['reads_skipped'] and self.base_listeners and self.loot_frame is not None:
+            self.complete_base(base, {name: self.loot_frame.roi(bbox) for name, bbox in LOOT_BBOXES.items()})
+        for listener in self.base_listeners:
+            listener(base)
+
+    def complete_base(self, base: dict, regions) -> dict:
+        """
+        Read the loot numbers read_resources() skipped because the decision was settled, so
+        telemetry holds all three values. Called once the decision is acted on (after the
+        next tap, while the new base loads); reads_skipped still counts the skipped reads.
+
+        Args:
+            base: Record of a decided base (see record_base); unread values are None
+            regions: {resource name: loot crop} of the base's frame
+
+        Returns:
+            dict: base, with the skipped values filled in where they could be read
+        """
+        unread = [name for name in regions if base.get(name) is None]
+        if not unread:
+            return base
+        try:
+            unsure = []
+            for name in unread:
+                if self.use_recognizer:
+                    text, confidence = self.digits.recognize(regions[name])
+                    if self.digits.is_confident(confidence):
+                        base[name] = self.extract_number(text)
+                        continue
+                unsure.append(name)
+            if unsure:
+                lines = self.tesseract.read_lines([self.preprocess_for_ocr(regions[name]) for name in unsure])
+                base.update({name: self.extract_number(line) for name, line in zip(unsure, lines)})
+        except Exception as e:
+            logging.warning(f"⚠️ Could not read the skipped loot for telemetry: {e}")
+        return base
+
+    def search_serially(self, max_searches=30000):
+        """Search loop reading, deciding and skipping one base at a time (see SearchPipeline)"""
+        base_started = time.monotonic()
         for attempt in range(max_searches):
             logging.info("\n" + "-"*40)
             logging.info(f"SEARCH ATTEMPT {attempt + 1}/{max_searches}")
@@ -340,20 +445,15 @@ class SearchSequence:
             
             try:
                 gold, elixir, dark = self.extract_resource_amounts()
-                
-                # Format threshold summary with visual indicators
-                gold_indicator = "✓" if gold >= self.gold_threshold else "✗"
-                elixir_indicator = "✓" if elixir >= self.elixir_threshold else "✗"
-                dark_indicator = "✓" if dark >= self.dark_threshold else "✗"
-                
+
                 # Count resources that meet thresholds
-                resources_met = sum([
-                    1 if gold >= self.gold_threshold else 0,
-                    1 if elixir >= self.elixir_threshold else 0,
-                    1 if dark >= self.dark_threshold else 0
-                ])
+                resources_met = self.count_resources_met(gold, elixir, dark)
+                meets = self.meets_threshold(gold, elixir, dark)
+                seconds = time.monotonic() - base_started
+                base_started = time.monotonic()
 
-                if self.meets_threshold(gold, elixir, dark):
+                if meets:
+                    self.record_base((gold, elixir, dark), "ATTACK", seconds)
                     logging.info("\n" + "*"*50)
                     logging.info(f"BASE FOUND - {resources_met}/3 THRESHOLDS MET - ATTACKING!")
                     logging.info("*"*50 + "\n")
@@ -361,6 +461,8 @@ class SearchSequence:
 
                 logging.info(f"Base does not meet requirements ({resources_met}/3 thresholds) - SKIPPING")
                 self.click_skip_button()
+                # Recorded after the tap, so reading what the decision skipped overlaps the load
+                self.record_base((gold, elixir, dark), "SKIP", seconds)
                 
             except Exception as e:
                 logging.error(f"❌ Error during search attempt {attempt + 1}: {e}")
@@ -401,8 +503,8 @@ class SearchSequence:
         # Also calibrate button detection
         self.calibrate_button_detection()
 
-        self.debugger.save_visualization("calibration_boxes.png")
-        logging.info("Saved calibration image to calibration_boxes.png")
+        self.debugger.save_visualization("calibration_boxes.png", force=True)
+        logging.info(f"Saved calibration image to {os.path.join(self.debugger.output_dir, 'calibration_boxes.png')}")
 
     def calibrate_button_detection(self):
         """Find and highlight buttons to calibrate button detection"""
@@ -411,39 +513,25 @@ class SearchSequence:
         buttons = ["attack_button.png", "find_match.png", "next_button.png"]
 
         for button in buttons:
-            button_path = os.path.join(self.image_folder, button)
-            if not os.path.exists(button_path):
-                logging.warning(f"Button template not found: {button_path}")
+            template = self.image.get_template(button, self.image_folder)
+            if template is None:
+                logging.warning(f"Button template not found: {button}")
                 continue
 
-            pos, confidence = self.image.find_image("calibration.png", button_path)
+            pos, confidence = self.image.find_image("calibration.png", template)
 
             if pos:
-                # Get button dimensions
-                template = cv2.imread(button_path)
-                if template is None:
-                    continue
-
-                h, w = template.shape[:2]
-
                 # Draw detection with confidence
                 self.debugger.draw_detection(
                     pos,
-                    (w, h),
+                    template.size,
                     f"{button} ({confidence:.1f}%)",
                     color=(0, 255, 255)
                 )
 
                 # Draw center point where click would happen
-                center_x = pos[0] + w // 2
-                center_y = pos[1] + h // 2
-
-                cv2.circle(
-                    self.debugger.current_visualization,
-                    (center_x, center_y),
-                    5,
-                    (0, 0, 255),
-                    -1
-                )
+                center_x, center_y = template.center(pos)
+
+                self.debugger.draw_circle((center_x, center_y), 5, (0, 0, 255))
             else:
                 logging.warning(f"Button not detected: {button}")
\ No newline at end of file
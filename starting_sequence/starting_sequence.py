@@ -5,11 +5,13 @@ import logging
 
 from utils.image_utils import ImageUtils
 from utils.adb_utils import ADBUtils 
+from utils.screen_state import ScreenClassifier, HOME
 
 class StartingSequence:
-    def __init__(self):
-        self.adb = ADBUtils()
+    def __init__(self, adb=None):
+        self.adb = adb or ADBUtils()
         self.image = ImageUtils()
+        self.screen = ScreenClassifier(self.adb, self.image)
         self.image_folder = os.path.join(os.path.dirname(__file__), "images")
         logging.info("\n" + "="*50)
         logging.info("STARTING SEQUENCE INITIALIZED")
@@ -21,13 +23,14 @@ class StartingSequence:
         logging.info("CHECKING GAME STATE")
         logging.info("-"*40)
         
-        home_anker = os.path.join(self.image_folder, "home_anker.png")
+        home_anker = self.image.get_template("home_anker.png", self.image_folder)
         
-        if not self.adb.take_screenshot("screen.png"):
+        frame = self.adb.recent_frame()
+        if frame is None:
             logging.error("❌ Failed to take screenshot while checking game state")
             return False
             
-        home_anker_pos = self.image.find_image("screen.png", home_anker)
+        home_anker_pos = self.image.find_image(frame, home_anker)
 
         if home_anker_pos:
             logging.info("✅ Game is in the expected state")
@@ -49,58 +52,57 @@ class StartingSequence:
 
             if self.image.find_and_click_image(self.adb, self.image_folder, "attack_button.png", confidence_threshold=0.6):
                 logging.info("✅ Successfully clicked 'attack_button.png'")
-                time.sleep(1)  # Short delay before checking for find match button
                 break  # Exit retry loop once clicked
             else:
                 logging.warning(f"⚠️ Could not find 'attack_button.png' on attempt {attempt + 1}")
-                time.sleep(1)  # Short delay before retrying
+                self.image.wait_for(self.adb, any_of=["attack_button.png"], image_folder=self.image_folder, timeout=1)
 
         # Step 2: Now, attempt to click "find_match.png" (if available)
         find_match_clicked = False
         for attempt in range(3):  # Try up to 3 times
             logging.info(f"Attempting to click 'find_match.png' (attempt {attempt + 1}/3)")
 
-            if self.image.detect_image(self.adb, self.image_folder, "find_match.png"):
-                if self.image.find_and_click_image(self.adb, self.image_folder, "find_match.png", confidence_threshold=0.6):
+            found, frame = self.image.wait_for(self.adb, any_of=["find_match.png"], image_folder=self.image_folder,
+                                               timeout=self.image.latency.timeout("find_match.png", default=1))
+            if found:
+                if self.image.find_and_click_image(self.adb, self.image_folder, "find_match.png", confidence_threshold=0.6, frame=frame):
                     logging.info("✅ Successfully clicked 'find_match.png'")
                     find_match_clicked = True  # Mark that we clicked find match
-                    logging.info("⏳ Waiting for resources to load...")
-                    time.sleep(random.uniform(2.5, 3.5))  # Mimic human delay
                     break  # Exit loop once successful
             else:
                 logging.warning(f"🚫 'find_match.png' not found on attempt {attempt + 1}, retrying...")
-                time.sleep(1)  # Short delay before retrying
 
         # Step 3: If "find_match.png" was NOT found, retry clicking "attack_button.png" after 3 failed attempts
         if not find_match_clicked:
             logging.info("🔄 'find_match.png' not found, retrying 'attack_button.png' to reopen the menu")
             self.image.find_and_click_image(self.adb, self.image_folder, "attack_button.png", confidence_threshold=0.6)
-            time.sleep(2)  # Give time for UI to update
 
             # Final check for "find_match.png"
             logging.info("🔍 Final attempt to find 'find_match.png'...")
-            if self.image.detect_image(self.adb, self.image_folder, "find_match.png"):
-                self.image.find_and_click_image(self.adb, self.image_folder, "find_match.png", confidence_threshold=0.6)
+            found, frame = self.image.wait_for(self.adb, any_of=["find_match.png"], image_folder=self.image_folder,
+                                               timeout=self.image.latency.timeout("find_match.png", default=2))
+            if found:
+                self.image.find_and_click_image(self.adb, self.image_folder, "find_match.png", confidence_threshold=0.6, frame=frame)
                 logging.info("✅ Successfully clicked 'find_match.png' on final attempt")
                 find_match_clicked = True
-                time.sleep(2)  # Extra wait for stability
 
         # Step 4: Only wait & click "end_battle.png" if "find_match.png" was successfully clicked
         if find_match_clicked:
-            logging.info("⏳ Waiting 2 seconds before checking for 'end_battle.png'...")
-            time.sleep(2)
+            logging.info("⏳ Waiting for resources to load and 'end_battle.png' to appear...")
+            found, frame = self.image.wait_for(self.adb, any_of=["end_battle.png"], image_folder=self.image_folder,
+                                               timeout=self.image.latency.timeout("end_battle.png", default=8))
 
-            if self.image.find_and_click_image(self.adb, self.image_folder, "end_battle.png", confidence_threshold=0.7):
+            if found and self.image.find_and_click_image(self.adb, self.image_folder, "end_battle.png", confidence_threshold=0.7, frame=frame):
                 logging.info("✅ Successfully clicked 'end_battle.png'")
-                time.sleep(random.uniform(1, 2))  # Mimic human delay
             else:
                 logging.warning("⏭️ 'end_battle.png' not found or could not be clicked")
         else:
             logging.error("❌ 'find_match.png' could not be found after multiple attempts. Skipping end battle.")
 
-        # Final short delay to ensure UI stability
+        # Wait until the village is shown again
         logging.info("⏳ Waiting for UI stabilization...")
-        time.sleep(2)
+        self.image.wait_for(self.adb, any_of=["home_anker.png"], image_folder=self.image_folder,
+                            timeout=self.image.latency.timeout("home_anker.png", default=3))
 
     def collect_resources(self):
         """Collect resources by clicking on resource icons."""
@@ -140,17 +142,16 @@ class StartingSequence:
         """Check if the game is currently on the home screen"""
         logging.info("Checking if we are on the home screen...")
         
-        if not self.adb.take_screenshot("screen.png"):
+        screen, frame = self.screen.current()
+        if frame is None:
             logging.error("❌ Failed to take screenshot while checking home screen")
             return False
             
-        # Check for home screen indicators
-        for marker in ["home_anker.png"]:
-            if self.image.detect_image(self.adb, self.image_folder, marker):
-                logging.info(f"✅ Home screen detected using {marker}")
-                return True
+        if self.screen.is_screen(frame, HOME):
+            logging.info("✅ Home screen detected")
+            return True
         
-        logging.warning("❌ Not on home screen")
+        logging.warning(f"❌ Not on home screen ({screen})")
         return False
 
     def navigate_to_home(self, max_attempts=5):
@@ -165,8 +166,9 @@ class StartingSequence:
         
         # Try clicking UI elements that can lead back to home
         for _ in range(max_attempts):
-            # Take a screenshot
-            if not self.adb.take_screenshot("screen.png"):
+            # Reuse the screenshot the home check was made on unless something was clicked since
+            frame = self.adb.recent_frame()
+            if frame is None:
                 continue
             
             # Check for buttons that can help return to home
@@ -177,20 +179,22 @@ class StartingSequence:
             ]
             
             clicked = False
+            detections = self.image.detect_many(frame, buttons, self.image_folder)
             for button in buttons:
-                if self.image.find_and_click_image(self.adb, self.image_folder, button):
+                pos, confidence = detections[button]
+                if pos:
+                    self.adb.humanlike_click(*self.image.get_template(button, self.image_folder).center(pos))
                     logging.info(f"✅ Clicked {button} to return home")
                     clicked = True
-                    time.sleep(1.5)
                     break
             
             # If we didn't click anything, try a special technique - click top left corner
             if not clicked:
                 logging.info("Trying to click top-left area (often has home/back button)")
                 self.adb.humanlike_click(50, 50)  # Top left is often a back button
-                time.sleep(1.5)
             
-            # Check if we reached home
+            # Give the click up to 1.5s to bring back the home screen, then check
+            self.image.wait_for(self.adb, any_of=[lambda frame: self.screen.is_screen(frame, HOME)], timeout=1.5)
             if self.is_home_screen():
                 logging.info("✅ Successfully navigated to home screen")
                 return True
@@ -1,14 +1,16 @@
 from utils.adb_utils import ADBUtils
 from utils.image_utils import ImageUtils
+from utils.screen_state import ScreenClassifier, POPUP, TRAIN_MENU
 import logging
 import time
 import random
 import os
 
 class TrainingSequence:
-    def __init__(self):
-        self.adb = ADBUtils()
+    def __init__(self, adb=None):
+        self.adb = adb or ADBUtils()
         self.image = ImageUtils()
+        self.screen = ScreenClassifier(self.adb, self.image)
         self.image_folder = os.path.join(os.path.dirname(__file__), "images")
         logging.info("\n" + "="*50)
         logging.info("TRAINING SEQUENCE INITIALIZED")
@@ -16,7 +18,8 @@ class TrainingSequence:
 
     def is_training_tab_open(self) -> bool:
         """Check if the training tab is open"""
-        result = self.image.detect_image(self.adb, self.image_folder, "train_menu.png")
+        _, frame = self.screen.current()
+        result = self.screen.is_screen(frame, TRAIN_MENU)
         if result:
             logging.info("✅ Training tab is open")
         else:
@@ -24,8 +27,9 @@ class TrainingSequence:
         return result
     
     def is_something_open(self) -> bool:
-        """Check if any popup or panel is open by looking for close button"""
-        result = self.image.detect_image(self.adb, self.image_folder, "close.png")
+        """Check if any popup or panel (including the training tab) is open"""
+        _, frame = self.screen.current()
+        result = self.screen.is_screen(frame, POPUP) or self.screen.is_screen(frame, TRAIN_MENU)
         if result:
             logging.info("⚠️ Detected open popup/panel (close button visible)")
         return result
@@ -39,7 +43,8 @@ class TrainingSequence:
         # Close any popups if open
         if self.is_something_open():
             logging.info("Closing open popup/panel...")
-            self.image.find_and_click_image(self.adb, self.image_folder, "close.png")
+            if self.image.find_and_click_image(self.adb, self.image_folder, "close.png"):
+                self.image.wait_for(self.adb, none_of=["close.png"], image_folder=self.image_folder, timeout=1.5)
             
         # Navigate to training tab if needed
         if not self.is_training_tab_open():
@@ -52,9 +57,10 @@ class TrainingSequence:
                 logging.info(f"Attempting to open training tab (attempt {attempt+1}/3)...")
                 if self.image.find_and_click_image(self.adb, self.image_folder, "train_button.png"):
                     logging.info("✅ Clicked train button")
-                    time.sleep(1)
+                    self.image.wait_for(self.adb, any_of=["train_menu.png"], image_folder=self.image_folder,
+                                        timeout=self.image.latency.timeout("train_menu.png", default=2))
                     break
-                time.sleep(1)
+                self.image.wait_for(self.adb, any_of=["train_button.png"], image_folder=self.image_folder, timeout=1)
                 
             # Check if navigation was successful
             if not self.is_training_tab_open():
@@ -81,7 +87,8 @@ class TrainingSequence:
                         return False
                     continue
                 
-                time.sleep(0.5)
+                # The okay dialog follows the confirmation when something has to be replaced
+                self.image.wait_for(self.adb, any_of=["okay.png"], image_folder=self.image_folder, timeout=0.5)
                 
                 # Click OK if present (not critical)
                 if self.image.find_and_click_image(self.adb, self.image_folder, "okay.png"):
@@ -89,14 +96,14 @@ class TrainingSequence:
                 
                 # Second confirmation click if needed
                 if self.image.find_and_click_image(self.adb, self.image_folder, "train_button_2.png"):
-                    time.sleep(0.5)
+                    self.image.wait_for(self.adb, any_of=["okay.png"], image_folder=self.image_folder, timeout=0.5)
                     self.image.find_and_click_image(self.adb, self.image_folder, "okay.png")
-                    time.sleep(0.5)
+                    self.image.wait_for(self.adb, none_of=["okay.png"], image_folder=self.image_folder, timeout=0.5)
                       # Second confirmation click if needed
                 if self.image.find_and_click_image(self.adb, self.image_folder, "train_button_2.png"):
-                    time.sleep(0.5)
+                    self.image.wait_for(self.adb, any_of=["okay.png"], image_folder=self.image_folder, timeout=0.5)
                     self.image.find_and_click_image(self.adb, self.image_folder, "okay.png")
-                    time.sleep(0.5)
+                    self.image.wait_for(self.adb, none_of=["okay.png"], image_folder=self.image_folder, timeout=0.5)
                     self.image.find_and_click_image(self.adb, self.image_folder, "close.png")
                     
                     logging.info("\n" + "-"*40)
@@ -0,0 +1,141 @@
+import os
+import socket
+import struct
+import threading
+import logging
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5037
+
+
+class ADBProtocolError(ConnectionError):
+    """
+    The adb server or device rejected a request.
+    A ConnectionError (so an OSError): callers drop the connection and retry it like any
+    other transport failure.
+    """
+
+
+class ADBClient:
+    """
+    Pure-Python client for the adb server's smart-socket protocol.
+
+    Talks to the adb server over TCP instead of forking the adb binary. Every
+    service (shell:, exec:, sync:) runs on its own connection that is first
+    switched to the device with host:transport. The sync connection is kept
+    open and reused for pulls; use ADBClient.for_device to share one client
+    (and its pooled connections) per device serial.
+    """
+
+    _pool = {}
+    _pool_lock = threading.Lock()
+
+    def __init__(self, serial=None, host=DEFAULT_HOST, port=None, timeout=10):
+        self.serial = serial
+        self.host = host
+        self.port = port or int(os.environ.get("ANDROID_ADB_SERVER_PORT", DEFAULT_PORT))
+        self.timeout = timeout
+        self.sync_socket = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_device(cls, serial=None):
+        """Return the pooled client for a device serial (None for the only device)."""
+        with cls._pool_lock:
+            if serial not in cls._pool:
+                cls._pool[serial] = cls(serial)
+            return cls._pool[serial]
+
+    @staticmethod
+    def _recv_exactly(sock, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("adb connection closed unexpectedly")
+            data += chunk
+        return bytes(data)
+
+    @staticmethod
+    def _recv_all(sock) -> bytes:
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def _send_request(self, sock, request: str):
+        """Send one length-prefixed request and check the OKAY/FAIL status."""
+        payload = request.encode()
+        sock.sendall(b"%04x" % len(payload) + payload)
+        status = self._recv_exactly(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            length = int(self._recv_exactly(sock, 4), 16)
+            message = self._recv_exactly(sock, length).decode(errors="replace")
+            raise ADBProtocolError(f"{request}: {message}")
+        raise ADBProtocolError(f"{request}: unexpected status {status!r}")
+
+    def open_service(self, service: str) -> socket.socket:
+        """Connect to the server, switch to the device and open a service on it."""
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        try:
+            transport = f"host:transport:{self.serial}" if self.serial else "host:transport-any"
+            self._send_request(sock, transport)
+            self._send_request(sock, service)
+            return sock
+        except Exception:
+            sock.close()
+            raise
+
+    def shell(self, command: str) -> bytes:
+        """Run a one-shot shell command and return its output."""
+        with self.open_service(f"shell:{command}") as sock:
+            return self._recv_all(sock)
+
+    def exec_out(self, command: str) -> bytes:
+        """Run a command with a raw (binary-safe) stdout stream and return the bytes."""
+        with self.open_service(f"exec:{command}") as sock:
+            return self._recv_all(sock)
+
+    def pull(self, remote_path: str) -> bytes:
+        """Read a file from the device over the pooled sync connection."""
+        with self.lock:
+            try:
+                return self._sync_recv(remote_path)
+            except (OSError, ADBProtocolError):
+                self.close()
+                raise
+
+    def _sync_recv(self, remote_path: str) -> bytes:
+        if self.sync_socket is None:
+            self.sync_socket = self.open_service("sync:")
+        sock = self.sync_socket
+
+        path = remote_path.encode()
+        sock.sendall(b"RECV" + struct.pack("<I", len(path)) + path)
+        chunks = []
+        while True:
+            header = self._recv_exactly(sock, 8)
+            kind, length = header[:4], struct.unpack("<I", header[4:])[0]
+            if kind == b"DATA":
+                chunks.append(self._recv_exactly(sock, length))
+            elif kind == b"DONE":
+                return b"".join(chunks)
+            elif kind == b"FAIL":
+                message = self._recv_exactly(sock, length).decode(errors="replace")
+                raise ADBProtocolError(f"pull {remote_path}: {message}")
+            else:
+                raise ADBProtocolError(f"pull {remote_path}: unexpected sync response {kind!r}")
+
+    def close(self):
+        """Close the pooled sync connection."""
+        if self.sync_socket is not None:
+            try:
+                self.sync_socket.sendall(b"QUIT" + struct.pack("<I", 0))
+            except OSError:
+                logging.debug("Sync connection already closed")
+            self.sync_socket.close()
+            self.sync_socket = None
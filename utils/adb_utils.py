@@ -1,23 +1,213 @@
+import os
 import subprocess
 import logging
+import queue
+import threading
 import time
 import random
+import socket
+import struct
+import cv2
+import numpy as np
+
+from utils.adb_client import ADBClient, ADBProtocolError
+from utils.frame import Frame
+from utils.frame_source import FrameSource
+
+# Raw screencap pixel formats (android.graphics.PixelFormat) -> conversion to BGR
+RAW_PIXEL_FORMATS = {
+    1: cv2.COLOR_RGBA2BGR,  # RGBA_8888
+    2: cv2.COLOR_RGBA2BGR,  # RGBX_8888
+    5: cv2.COLOR_BGRA2BGR,  # BGRA_8888
+}
+
+def adb_command(serial, *args) -> list[str]:
+    """Build an adb binary command line, targeting a specific device if a serial is given."""
+    if serial:
+        return ["adb", "-s", serial, *args]
+    return ["adb", *args]
+
+
+class ADBShellSession:
+    """
+    A long-lived adb shell that runs commands written to its stdin.
+
+    The shell is either an `adb shell` process or, when an ADBClient is given, an
+    interactive shell: service opened directly on the adb server socket.
+    Each command is followed by an echo of a unique marker and its exit status, so the
+    output of every command can be matched to its completion. A dead session is
+    restarted transparently on the next command.
+    """
+
+    def __init__(self, serial=None, client=None, timeout=10):
+        self.serial = serial
+        self.client = client
+        self.timeout = timeout
+        self.process = None
+        self.socket = None
+        self.stdin = None
+        self.output = None
+        self.alive = False
+        self.started = False
+        self.lock = threading.Lock()
+        self.command_count = 0
+        self.restarts = 0
+
+    def start(self):
+        """Open the shell and start the thread that collects its output."""
+        if self.client is not None:
+            self.socket = self.client.open_service("shell:")
+            self.socket.settimeout(None)
+            self.stdin = self.socket.makefile("wb")
+            stdout = self.socket.makefile("rb")
+        else:
+            self.process = subprocess.Popen(
+                adb_command(self.serial, "shell"),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT
+            )
+            self.stdin = self.process.stdin
+            stdout = self.process.stdout
+
+        self.output = queue.Queue()
+        self.alive = True
+        self.started = True
+        threading.Thread(target=self._read_output, args=(stdout, self.output), daemon=True).start()
+
+    def _read_output(self, stdout, output):
+        """Forward output lines to the queue; None marks the end of the session."""
+        try:
+            for line in iter(stdout.readline, b""):
+                output.put(line.decode(errors="replace").rstrip("\r\n"))
+        except OSError:
+            pass
+        if output is self.output:
+            self.alive = False
+        output.put(None)
+
+    def is_alive(self) -> bool:
+        if self.process is not None and self.process.poll() is not None:
+            return False
+        return self.alive
+
+    def run(self, command: str) -> tuple[int, str]:
+        """
+        Run a command in the session and wait for it to complete.
+
+        Returns:
+            tuple: (exit status, combined output)
+
+        Raises:
+            ConnectionError: If the session died while the command was running
+            TimeoutError: If the command did not complete within the timeout
+        """
+        with self.lock:
+            if not self.is_alive():
+                if self.started:
+                    self.restarts += 1
+                    logging.warning(f"ADB shell session died, reconnecting (restart {self.restarts})")
+                    self.close()
+                self.start()
+
+            self.command_count += 1
+            marker = f"__adb_done_{self.command_count}__"
+            try:
+                self.stdin.write(f"{command}; echo {marker} $?\n".encode())
+                self.stdin.flush()
+                return self._wait_for_marker(marker)
+            except (OSError, TimeoutError):
+                # Leftover output would be attributed to the next command, so start over
+                self.close()
+                raise
+
+    def _wait_for_marker(self, marker: str) -> tuple[int, str]:
+        lines = []
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                line = self.output.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                raise TimeoutError(f"No completion marker within {self.timeout}s")
+            if line is None:
+                raise ConnectionError("ADB shell session closed")
+            if line.startswith(marker):
+                return int(line.split()[-1]), "\n".join(lines)
+            lines.append(line)
+
+    def close(self):
+        """Terminate the shell."""
+        self.alive = False
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process = None
+        if self.socket is not None:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.socket.close()
+            self.socket = None
+        self.stdin = None
+
 
 class ADBUtils:
-    def __init__(self, max_retries=3):
+    def __init__(self, max_retries=3, save_screenshots=False, capture_mode="png", backend="binary", serial=None,
+                 background_capture=False):
+        """
+        Args:
+            max_retries: Number of attempts for each ADB command
+            save_screenshots: If True, also write every capture to screen.png (debugging)
+            capture_mode: "png" for screencap -p, "raw" for the uncompressed framebuffer dump
+            backend: "binary" to run the adb client binary, "socket" to talk to the
+                adb server directly over its wire protocol
+            serial: Device serial to drive (defaults to $ANDROID_SERIAL, else the only device)
+            background_capture: If True, capture continuously on a background thread
+                (see FrameSource) and serve capture_screen from its buffer
+        """
+        if capture_mode not in ("png", "raw"):
+            raise ValueError(f"Unknown capture mode: {capture_mode}")
+        if backend not in ("binary", "socket"):
+            raise ValueError(f"Unknown ADB backend: {backend}")
         self.max_retries = max_retries
+        self.capture_mode = capture_mode
+        self.backend = backend
+        self.serial = serial or os.environ.get("ANDROID_SERIAL")
+        self.client = ADBClient.for_device(self.serial) if backend == "socket" else None
+        # Opt-in debug mode: also write every capture to screen.png on disk
+        self.save_screenshots = save_screenshots
+        self.last_frame = None
+        # Shell commands (taps) share one persistent adb shell process
+        self.shell_session = ADBShellSession(serial=self.serial, client=self.client)
+        # time.monotonic() of the last shell command and of the last frame handed out
+        self.last_action_time = 0.0
+        self.last_frame_time = 0.0
+        self.frame_source = FrameSource(self.grab_frame) if background_capture else None
+        if self.frame_source is not None:
+            self.frame_source.start()
 
     def execute_adb(self, command: str, shell=True) -> bool:
         """Execute an ADB command with retries and error handling."""
         for attempt in range(self.max_retries):
+            if shell:
+                self.last_action_time = time.monotonic()
+                try:
+                    exit_code, output = self.shell_session.run(command)
+                except (OSError, TimeoutError) as e:
+                    logging.error(f"ADB shell session failed (attempt {attempt + 1}): {e}")
+                    time.sleep(1)
+                    continue
+                if exit_code == 0:
+                    return True
+                logging.error(f"ADB command failed (attempt {attempt + 1}): {output.strip()}")
+                time.sleep(1)
+                continue
+
             try:
-                if shell:
-                    cmd = f"adb shell {command}"
-                else:
-                    cmd = f"adb {command}"
-                    
-                result = subprocess.run(
-                    cmd,
+                subprocess.run(
+                    " ".join(adb_command(self.serial, command)),
                     shell=True,
                     check=True,
                     capture_output=True,
@@ -29,22 +219,164 @@ class ADBUtils:
                 time.sleep(1)
         return False
 
+    def exec_out(self, command: list[str]) -> bytes | None:
+        """Run a command through adb exec-out and return its raw stdout bytes."""
+        for attempt in range(self.max_retries):
+            if self.client is not None:
+                try:
+                    return self.client.exec_out(" ".join(command))
+                except (OSError, ADBProtocolError) as e:
+                    logging.error(f"ADB exec failed (attempt {attempt + 1}): {e}")
+                    time.sleep(1)
+                continue
+
+            try:
+                result = subprocess.run(
+                    adb_command(self.serial, "exec-out", *command),
+                    check=True,
+                    capture_output=True
+                )
+                return result.stdout
+            except subprocess.CalledProcessError as e:
+                logging.error(f"ADB exec-out failed (attempt {attempt + 1}): {e.stderr.decode(errors='replace').strip()}")
+                time.sleep(1)
+        return None
+
+    @staticmethod
+    def parse_raw_screencap(data: bytes) -> tuple[np.ndarray, int]:
+        """
+        Parse raw screencap output into a (height, width, 4) pixel view without copying.
+
+        The header is width, height and pixel format as little-endian uint32, followed
+        by a colour space field on Android 9+, so its size is inferred from the payload.
+
+        Returns:
+            tuple: (read-only pixel array in the device channel order, pixel format)
+        """
+        width, height, pixel_format = struct.unpack_from("<III", data, 0)
+        if pixel_format not in RAW_PIXEL_FORMATS:
+            raise ValueError(f"Unsupported raw pixel format: {pixel_format}")
+
+        payload_size = width * height * 4
+        header_size = len(data) - payload_size
+        if header_size not in (12, 16):
+            raise ValueError(f"Unexpected raw screencap size {len(data)} for {width}x{height}")
+
+        pixels = np.frombuffer(data, np.uint8, count=payload_size, offset=header_size)
+        return pixels.reshape(height, width, 4), pixel_format
+
+    def capture_raw(self) -> tuple[np.ndarray, int] | None:
+        """
+        Capture the raw framebuffer, skipping PNG encoding on the device and decoding on the host.
+
+        Returns:
+            tuple: (pixel array, pixel format) as from parse_raw_screencap, or None on failure
+        """
+        data = self.exec_out(["screencap"])
+        if data is None:
+            return None
+        try:
+            return self.parse_raw_screencap(data)
+        except (ValueError, struct.error) as e:
+            logging.error(f"Raw screenshot parse failed: {e}")
+            return None
+
+    def capture_frame(self):
+        """
+        Return a Frame showing the screen after the last action.
+
+        With background capture running this waits for the next buffered frame captured
+        after both the last shell command and the previously returned frame, instead of
+        starting a capture of its own.
+
+        Returns:
+            Frame: The captured frame, or None if the capture failed
+        """
+        if self.frame_source is not None and self.frame_source.running:
+            frame = self.frame_source.latest(newer_than=max(self.last_action_time, self.last_frame_time))
+            if frame is None:
+                logging.error("No new frame from background capture")
+                return None
+        else:
+            frame = self.grab_frame()
+            if frame is None:
+                return None
+
+        self.last_frame = frame
+        self.last_frame_time = frame.timestamp
+        if self.save_screenshots:
+            cv2.imwrite("screen.png", frame.image)
+        return frame
+
+    def recent_frame(self, max_age=1.0):
+        """
+        Return the last captured Frame if nothing was sent to the device since it was taken
+        and it is at most max_age seconds old; otherwise capture a new one.
+        Lets consecutive checks of an unchanged screen share one screenshot.
+        """
+        frame = self.last_frame
+        if (frame is not None and frame.timestamp > self.last_action_time
+                and time.monotonic() - frame.timestamp <= max_age):
+            return frame
+        return self.capture_frame()
+
+    def capture_screen(self):
+        """
+        Return a BGR screenshot showing the screen after the last action.
+
+        Returns:
+            numpy.ndarray: The captured image, or None if the capture failed
+        """
+        frame = self.capture_frame()
+        return frame.image if frame is not None else None
+
+    def grab_frame(self):
+        """
+        Capture a screenshot over exec-out right now.
+
+        In raw mode the device pixels are kept as is and only converted to BGR when a
+        consumer asks for Frame.image; use capture_raw to work on them directly.
+
+        Returns:
+            Frame: The captured frame, or None if the capture failed
+        """
+        started = time.monotonic()
+        if self.capture_mode == "raw":
+            raw = self.capture_raw()
+            if raw is None:
+                return None
+            pixels, pixel_format = raw
+            return Frame(raw=pixels, raw_conversion=RAW_PIXEL_FORMATS[pixel_format], timestamp=started)
+
+        data = self.exec_out(["screencap", "-p"])
+        if data is None:
+            return None
+        screenshot = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if screenshot is None:
+            logging.error(f"Screenshot decode failed: {len(data)} bytes received")
+            return None
+        return Frame(screenshot, timestamp=started)
+
+    def pull(self, remote_path: str, local_path: str) -> bool:
+        """Copy a file from the device to the local machine."""
+        if self.client is None:
+            return self.execute_adb(f"pull {remote_path} {local_path}", shell=False)
+        try:
+            data = self.client.pull(remote_path)
+        except (OSError, ADBProtocolError) as e:
+            logging.error(f"ADB pull failed: {e}")
+            return False
+        with open(local_path, "wb") as f:
+            f.write(data)
+        return True
+
     def take_screenshot(self, filename: str) -> bool:
-        """Capture a screenshot and pull it to the local machine."""
+        """Capture a screenshot and save it to a local file (debugging and calibration only)."""
         try:
-            # Take screenshot on device
-            if not self.execute_adb(f"screencap -p /sdcard/{filename}"):
-                return False
-                
-            # Pull file from device to local machine
-            if not self.execute_adb(f"pull /sdcard/{filename} .", shell=False):
+            screenshot = self.capture_screen()
+            if screenshot is None:
                 return False
-                
-            # Clean up file on device
-            if not self.execute_adb(f"rm /sdcard/{filename}"):
-                logging.warning("Failed to clean up screenshot on device")
-                
-            return True
+            return cv2.imwrite(filename, screenshot)
         except Exception as e:
             logging.error(f"Screenshot failed: {e}")
             return False
@@ -57,4 +389,10 @@ class ADBUtils:
         x += random.randint(-5, 5)
         y += random.randint(-5, 5)
         self.execute_adb(f"input tap {x} {y}")
-        time.sleep(random.uniform(0.2, 0.5))
\ No newline at end of file
+        time.sleep(random.uniform(0.2, 0.5))
+
+    def close(self):
+        """Stop background capture and shut down the persistent shell session."""
+        if self.frame_source is not None:
+            self.frame_source.stop()
+        self.shell_session.close()
@@ -1,81 +1,193 @@
 import cv2
 import os
+import queue
 import logging
+import threading
 from datetime import datetime
+from utils.frame import Frame
+
+DEBUG_MODES = ("off", "sampled", "on-failure", "on")
+# Debug images go here rather than the working directory, whose result.png and
+# troop_detection.png in the repo are recorded reference captures
+DEBUG_DIR = "debug"
+
+class DebugSink:
+    """
+    Decides which debug images get written and writes them on a background thread.
+
+    Modes:
+        off:        nothing is recorded (no copies, no disk I/O)
+        sampled:    every Nth debug event is recorded
+        on-failure: only events reported as failures are recorded
+        on:         every event is recorded
+
+    Rendering and encoding happen on the writer thread. The queue is bounded and
+    new images are dropped when it is full, so debugging never stalls the bot.
+    """
+
+    def __init__(self, mode="off", sample_every=10, queue_size=16):
+        self.configure(mode, sample_every)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.event_count = 0
+        self.written_count = 0
+        self.dropped_count = 0
+
+    def configure(self, mode="off", sample_every=10):
+        if mode not in DEBUG_MODES:
+            raise ValueError(f"Unknown debug mode: {mode}")
+        self.mode = mode
+        self.sample_every = max(1, sample_every)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def should_record(self, failed=False) -> bool:
+        """Count one debug event and decide whether it should be recorded."""
+        if self.mode == "off":
+            return False
+        if self.mode == "on":
+            return True
+        if self.mode == "on-failure":
+            return failed
+        with self.lock:
+            self.event_count += 1
+            return self.event_count % self.sample_every == 0
+
+    def submit(self, path, render, *args):
+        """
+        Queue render(*args) to be written to path on the writer thread.
+        Returns False if the image was dropped because the queue is full.
+        """
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="debug-writer", daemon=True)
+                self.thread.start()
+        try:
+            self.queue.put_nowait((path, render, args))
+            return True
+        except queue.Full:
+            self.dropped_count += 1
+            return False
+
+    def submit_image(self, path, image):
+        """Queue an image that is written as is."""
+        return self.submit(path, lambda img: img, image)
+
+    def _run(self):
+        while True:
+            path, render, args = self.queue.get()
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                cv2.imwrite(path, render(*args))
+                self.written_count += 1
+            except Exception as e:
+                logging.error(f"Error writing debug image {path}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wait until every queued image has been written."""
+        if self.thread is not None:
+            self.queue.join()
+
+debug_sink = DebugSink()
+
+def configure_debug(mode="off", sample_every=10):
+    """Set the process-wide debug mode (see DebugSink)."""
+    debug_sink.configure(mode, sample_every)
 
 class DebugVisualizer:
-    def __init__(self, output_dir="."):
+    def __init__(self, output_dir=DEBUG_DIR, sink=None):
         """Initialize the debug visualizer"""
         self.output_dir = output_dir
+        self.sink = sink or debug_sink
         self.current_screenshot = None
-        self.current_visualization = None
-    
-    def load_screenshot(self, screenshot_path):
-        """Load screenshot for visualization"""
+        # Drawing operations are recorded and only rendered if the image gets saved
+        self.operations = []
+
+    def load_screenshot(self, screenshot):
+        """Load screenshot for visualization (Frame, BGR array or file path); the screenshot is not copied"""
         try:
-            self.current_screenshot = cv2.imread(screenshot_path)
-            if self.current_screenshot is not None:
-                self.current_visualization = self.current_screenshot.copy()
-                return True
-            return False
+            if isinstance(screenshot, str):
+                screenshot = cv2.imread(screenshot)
+            elif isinstance(screenshot, Frame):
+                screenshot = screenshot.image
+            self.current_screenshot = screenshot
+            self.operations = []
+            return self.current_screenshot is not None
         except Exception as e:
             logging.error(f"Error loading screenshot: {e}")
             return False
-    
+
     def draw_detection(self, position, size, label, color=(0, 255, 0)):
         """Draw a box with label around detected area"""
-        if self.current_visualization is None:
+        if self.current_screenshot is None:
             return False
-        
-        try:
-            x, y = position
-            w, h = size
-            cv2.rectangle(
-                self.current_visualization, 
-                (x, y), 
-                (x + w, y + h), 
-                color, 
-                2
-            )
-            
-            cv2.putText(
-                self.current_visualization,
-                label,
-                (x, y - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                color,
-                2
-            )
-            
-            return True
-            
-        except Exception as e:
-            logging.error(f"Error drawing detection: {e}")
+        x, y = position
+        w, h = size
+        self.operations.append(("rectangle", ((x, y), (x + w, y + h), color, 2)))
+        if label:
+            self.operations.append(("text", (label, (x, y - 10), 0.5, color, 2)))
+        return True
+
+    def draw_text(self, text, position, scale=0.6, color=(255, 255, 255), thickness=2):
+        """Draw a line of text"""
+        if self.current_screenshot is None:
+            return False
+        self.operations.append(("text", (text, position, scale, color, thickness)))
+        return True
+
+    def draw_circle(self, center, radius, color, thickness=-1):
+        """Draw a circle (filled by default)"""
+        if self.current_screenshot is None:
             return False
-    
-    def save_visualization(self, filename="result.png"):
-        """Save the current visualization to a file"""
-        if self.current_visualization is None:
+        self.operations.append(("circle", (center, radius, color, thickness)))
+        return True
+
+    @staticmethod
+    def render(screenshot, operations, timestamp):
+        """Apply recorded drawing operations to a copy of the screenshot"""
+        visualization = screenshot.copy()
+        for kind, args in operations:
+            if kind == "rectangle":
+                cv2.rectangle(visualization, *args)
+            elif kind == "circle":
+                cv2.circle(visualization, *args)
+            else:
+                text, position, scale, color, thickness = args
+                cv2.putText(visualization, text, position, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+
+        # Add timestamp
+        cv2.putText(visualization, timestamp, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        return visualization
+
+    def save_visualization(self, filename="result.png", failed=False, force=False):
+        """
+        Save the current visualization to a file if the debug sink wants this event.
+
+        Args:
+            filename: Output file name within output_dir
+            failed: Whether this visualization documents a failed detection
+            force: Write immediately regardless of the debug mode (calibration)
+        """
+        if self.current_screenshot is None:
+            return False
+        if not force and not self.sink.should_record(failed):
             return False
-        
+
         try:
-            # Add timestamp
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cv2.putText(
-                self.current_visualization,
-                timestamp,
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.7,
-                (255, 255, 255),
-                2
-            )
-            
             output_path = os.path.join(self.output_dir, filename)
-            cv2.imwrite(output_path, self.current_visualization)
-            return True
-            
+            if force:
+                os.makedirs(self.output_dir, exist_ok=True)
+                return cv2.imwrite(output_path, self.render(self.current_screenshot, self.operations, timestamp))
+            return self.sink.submit(output_path, self.render, self.current_screenshot, list(self.operations), timestamp)
+
         except Exception as e:
             logging.error(f"Error saving visualization: {e}")
-            return False 
\ No newline at end of file
+            return False
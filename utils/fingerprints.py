@@ -0,0 +1,288 @@
+"""
+Pixel-probe fingerprints: a few pixel colours at the fixed spot of a UI element.
+
+A fingerprint is learned once from a reference capture showing the element. Checking
+it reads only those pixels from a frame, so answering "is the element there?" costs
+microseconds instead of a template match. Answers in between "all probes match" and
+"most probes differ" are reported as ambiguous and confirmed by template matching.
+
+A fingerprint is only trusted once it has been checked on enough captures it was not
+learned from, both showing the element and not showing it. Until then every answer is
+reported as ambiguous, so a bad probe costs a template match instead of a missed or
+phantom button. A "present" answer means the template matches at the confidence the
+validation captures were labelled at; callers asking for more fall through to matching.
+
+Learn fingerprints for the fixed-position templates found in reference captures, and
+validate them on held-out captures (other screens, other bases):
+    python -m utils.fingerprints reference.png [more.png ...] [--validate held_out.png ...]
+                                 [--template key ...]
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import cv2
+import numpy as np
+from utils.frame import Frame
+
+FINGERPRINTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fingerprints.json")
+
+# UI elements that always sit at the same spot when shown (cards and army icons move)
+FINGERPRINT_TEMPLATES = [
+    "starting_sequence/home_anker.png",
+    "train_sequence/home_anker.png",
+    "search_sequence/attack_button.png",
+    "starting_sequence/attack_button.png",
+    "search_sequence/find_match.png",
+    "starting_sequence/find_match.png",
+    "search_sequence/next_button.png",
+    "attack_sequence/end_battle.png",
+    "starting_sequence/end_battle.png",
+    "attack_sequence/attack_menu.png",
+    "attack_sequence/return_home.png",
+    "attack_sequence/claim_reward.png",
+    "attack_sequence/continue.png",
+    "train_sequence/train_button.png",
+    "check_train_army/train_button.png",
+    "train_sequence/train_menu.png",
+    "train_sequence/quick_train_button.png",
+    "train_sequence/close.png",
+    "starting_sequence/close.png",
+]
+
+# Share of probes that must match for "present", and at most may match for "absent"
+PRESENT_FRACTION = 0.85
+ABSENT_FRACTION = 0.4
+# Held-out captures with, and without, the element a fingerprint must have answered
+# correctly before its answers are trusted
+MIN_VALIDATIONS = 5
+# Match confidence that labels a validation capture as showing the element
+VALIDATION_CONFIDENCE = 0.8
+# Probes must cover this many distinct colours, so a plain patch of one colour elsewhere
+# on screen cannot match them all
+MIN_DISTINCT_COLOURS = 3
+
+
+class Fingerprint:
+    """Probe pixels (x, y, BGR colour, tolerance) in reference-frame coordinates."""
+
+    def __init__(self, key: str, probes, reference_size: tuple[int, int], position=None,
+                 present_validations=0, absent_validations=0, confidence=VALIDATION_CONFIDENCE):
+        self.key = key
+        # Held-out captures with / without the element on which the probes answered correctly
+        self.present_validations = present_validations
+        self.absent_validations = absent_validations
+        # Match confidence a "present" answer stands for
+        self.confidence = confidence
+        self.reference_size = tuple(reference_size)
+        # Top-left corner of the template in the reference capture
+        self.position = tuple(position) if position is not None else None
+        probes = np.array(probes, dtype=np.int32).reshape(-1, 6)
+        self.xs, self.ys = probes[:, 0], probes[:, 1]
+        self.colours = probes[:, 2:5]
+        self.tolerances = probes[:, 5:6]
+        self._scaled = {}
+
+    def coordinates(self, width: int, height: int):
+        """Probe coordinates for a frame of the given size."""
+        if (width, height) == self.reference_size:
+            return self.xs, self.ys
+        if (width, height) not in self._scaled:
+            ref_width, ref_height = self.reference_size
+            self._scaled[width, height] = (
+                np.clip(self.xs * width // ref_width, 0, width - 1),
+                np.clip(self.ys * height // ref_height, 0, height - 1),
+            )
+        return self._scaled[width, height]
+
+    def match_fraction(self, frame) -> float:
+        """Share of probes whose colour is within tolerance in the frame."""
+        xs, ys = self.coordinates(frame.width, frame.height)
+        pixels = frame.pixels(xs, ys).astype(np.int32)
+        return float((np.abs(pixels - self.colours) <= self.tolerances).all(axis=1).mean())
+
+    @property
+    def validated(self) -> bool:
+        return min(self.present_validations, self.absent_validations) >= MIN_VALIDATIONS
+
+    def answer(self, frame) -> bool | None:
+        """The probes' answer, trusted or not: True, False, or None if they disagree."""
+        fraction = self.match_fraction(frame)
+        if fraction >= PRESENT_FRACTION:
+            return True
+        if fraction <= ABSENT_FRACTION:
+            return False
+        return None
+
+    def check(self, frame) -> bool | None:
+        """True if the element is shown, False if not, None if unsure or not validated yet."""
+        if not self.validated:
+            return None
+        return self.answer(frame)
+
+    def distinct_colours(self) -> int:
+        """Number of probe colours differing from each other by more than the tolerance."""
+        distinct = []
+        for colour, tolerance in zip(self.colours, self.tolerances[:, 0]):
+            if all(np.abs(colour - other).max() > tolerance for other in distinct):
+                distinct.append(colour)
+        return len(distinct)
+
+    @classmethod
+    def learn(cls, key: str, image, bbox, probe_count=8, tolerance=24):
+        """
+        Pick probes inside bbox of a reference capture.
+        Probes sit on flat patches (so a pixel of jitter does not change their colour) and
+        are spread over distinct colours and places, so other screens rarely match them all.
+        Returns None if the element has too few flat pixels, or too few distinct colours
+        (MIN_DISTINCT_COLOURS) or spread-out places for such probes.
+        """
+        x1, y1, x2, y2 = bbox
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        mean = cv2.blur(gray, (5, 5))
+        flatness = cv2.blur(gray * gray, (5, 5)) - mean * mean
+
+        step = max(2, min(x2 - x1, y2 - y1) // 8)
+        candidates = [
+            (x, y) for y in range(y1 + 2, y2 - 2, step) for x in range(x1 + 2, x2 - 2, step)
+            if flatness[y, x] < 150
+        ]
+        if len(candidates) < probe_count:
+            return None
+
+        points = np.array(candidates)
+        colours = image[points[:, 1], points[:, 0]].astype(np.float32)
+        chosen = [int(np.argmin(flatness[points[:, 1], points[:, 0]]))]
+        while len(chosen) < probe_count:
+            # Farthest-point selection over colour and (half-weighted) position
+            distances = np.min([
+                np.linalg.norm(colours - colours[i], axis=1) + 0.5 * np.linalg.norm(points - points[i], axis=1)
+                for i in chosen
+            ], axis=0)
+            chosen.append(int(np.argmax(distances)))
+
+        probes = [(*points[i], *image[points[i][1], points[i][0]], tolerance) for i in chosen]
+        height, width = image.shape[:2]
+        fingerprint = cls(key, probes, (width, height), position=(x1, y1))
+        spread_x = np.ptp(fingerprint.xs) >= (x2 - x1) / 2
+        spread_y = np.ptp(fingerprint.ys) >= (y2 - y1) / 2
+        if fingerprint.distinct_colours() < MIN_DISTINCT_COLOURS or not (spread_x or spread_y):
+            return None
+        return fingerprint
+
+    def to_dict(self) -> dict:
+        return {
+            "reference_size": list(self.reference_size),
+            "position": list(self.position) if self.position is not None else None,
+            "present_validations": self.present_validations,
+            "absent_validations": self.absent_validations,
+            "confidence": self.confidence,
+            "probes": np.hstack([self.xs[:, None], self.ys[:, None], self.colours, self.tolerances]).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, key: str, data: dict):
+        return cls(key, data["probes"], data["reference_size"], data.get("position"),
+                   data.get("present_validations", 0), data.get("absent_validations", 0),
+                   data.get("confidence", VALIDATION_CONFIDENCE))
+
+
+def load_fingerprints(path=FINGERPRINTS_FILE) -> dict:
+    """Read learned fingerprints keyed by template key (empty if none were learned)."""
+    try:
+        with open(path) as f:
+            return {key: Fingerprint.from_dict(key, data) for key, data in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"⚠️ Could not read fingerprints from {path}: {e}")
+        return {}
+
+
+def save_fingerprints(fingerprints: dict, path=FINGERPRINTS_FILE):
+    with open(path, "w") as f:
+        json.dump({key: fingerprints[key].to_dict() for key in sorted(fingerprints)}, f, indent=1)
+        f.write("\n")
+
+
+_fingerprints = None
+_fingerprints_lock = threading.Lock()
+
+
+def get_fingerprints() -> dict:
+    """Return the process-wide fingerprints, loading them on first use."""
+    global _fingerprints
+    with _fingerprints_lock:
+        if _fingerprints is None:
+            _fingerprints = load_fingerprints()
+        return _fingerprints
+
+
+def main():
+    # Imported here to avoid a circular import (ImageUtils uses the fingerprints)
+    from utils.image_utils import ImageUtils
+    from utils.template_registry import get_template_registry
+
+    parser = argparse.ArgumentParser(description="Learn pixel-probe fingerprints from reference captures")
+    parser.add_argument("references", nargs="+", help="Reference screenshots")
+    parser.add_argument("--validate", nargs="+", default=[],
+                        help="Held-out screenshots, not used for learning, that validate the answers")
+    parser.add_argument("--template", nargs="+", default=FINGERPRINT_TEMPLATES,
+                        help="Template keys to learn (default: fixed-position UI elements)")
+    parser.add_argument("--min-confidence", type=float, default=0.9)
+    parser.add_argument("--probes", type=int, default=8)
+    parser.add_argument("--tolerance", type=int, default=24)
+    args = parser.parse_args()
+
+    registry = get_template_registry()
+    templates = [registry.get(key) for key in args.template]
+    frames = [(path, Frame.wrap(path)) for path in args.references]
+    held_out = [(path, Frame.wrap(path)) for path in args.validate if path not in args.references]
+    fingerprints = load_fingerprints()
+
+    learned = {}
+    for path, frame in frames:
+        for template in templates:
+            if template is None or template.key in learned:
+                continue
+            (x, y), confidence = ImageUtils.match_template(frame.view(template.mode), template)
+            if confidence < args.min_confidence:
+                continue
+            fingerprint = Fingerprint.learn(template.key, frame.image, (x, y, x + template.width, y + template.height),
+                                            args.probes, args.tolerance)
+            if fingerprint is None:
+                print(f"{template.key}: too few flat pixels or distinct colours for probes")
+                continue
+            learned[template.key] = fingerprint
+            print(f"{template.key}: learned at {(x, y)} from {os.path.basename(path)}")
+
+    # Every fingerprint must agree with template matching on all captures; held-out captures
+    # with and without the element count towards trusting its answers
+    for key, fingerprint in list(learned.items()):
+        template = registry.get(key)
+        for held, (path, frame) in [(False, item) for item in frames] + [(True, item) for item in held_out]:
+            _, confidence = ImageUtils.match_template(frame.view(template.mode), template)
+            shown = confidence >= VALIDATION_CONFIDENCE
+            answer = fingerprint.answer(frame)
+            if answer is not None and answer != shown:
+                print(f"  {key} disagrees with template matching on {os.path.basename(path)} "
+                      f"(probes {fingerprint.match_fraction(frame):.2f}, match {confidence:.3f}), not saved")
+                del learned[key]
+                break
+            if held and answer is True:
+                fingerprint.present_validations += 1
+            elif held and answer is False:
+                fingerprint.absent_validations += 1
+        else:
+            print(f"  {key}: right on {fingerprint.present_validations} held-out captures showing it and "
+                  f"{fingerprint.absent_validations} without, "
+                  f"{'trusted' if fingerprint.validated else 'not trusted yet (template matching is used)'}")
+
+    fingerprints.update(learned)
+    save_fingerprints(fingerprints)
+    print(f"Saved {len(fingerprints)} fingerprints to {FINGERPRINTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
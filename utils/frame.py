@@ -0,0 +1,152 @@
+import time
+import cv2
+
+# Image representations templates can be matched in, cheapest first
+MATCH_MODES = ("gray", "edge", "bgr")
+# Canny hysteresis thresholds for the "edge" mode
+EDGE_THRESHOLDS = (50, 150)
+# Grid of block averages (width, height) that make up a frame's change signature
+SIGNATURE_SIZE = (64, 36)
+# Grayscale difference above which a pixel counts as changed (captures are lossless)
+PIXEL_TOLERANCE = 24
+
+
+def match_view(image, mode: str):
+    """Convert a BGR image to the representation used by a match mode."""
+    if mode == "bgr":
+        return image
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if mode == "gray":
+        return gray
+    if mode == "edge":
+        return cv2.Canny(gray, *EDGE_THRESHOLDS)
+    raise ValueError(f"Unknown match mode: {mode}")
+
+
+class Frame:
+    """
+    One decoded screenshot, shared by every matcher and OCR step that looks at it.
+
+    Derived views (BGR from raw device pixels, grayscale, the downscaled pyramid and
+    cropped regions) are computed on first use and cached, so checking N templates
+    against one capture costs a single decode.
+    """
+
+    def __init__(self, image=None, timestamp=None, raw=None, raw_conversion=None):
+        """
+        Args:
+            image: Decoded BGR image
+            timestamp: time.monotonic() at capture start (defaults to now)
+            raw: Device pixel array to convert lazily instead of a BGR image
+            raw_conversion: cv2.cvtColor code that turns raw into BGR
+        """
+        if image is None and raw is None:
+            raise ValueError("Frame needs an image or raw pixels")
+        self._image = image
+        self.raw = raw
+        self.raw_conversion = raw_conversion
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self._gray = None
+        self._edges = None
+        self._signature = None
+        self._pyramids = {}
+        self._rois = {}
+        # Screen label assigned by ScreenClassifier (None until classified)
+        self.screen_state = None
+
+    @classmethod
+    def wrap(cls, screenshot):
+        """Return screenshot as a Frame, accepting a Frame, a BGR array or an image path."""
+        if screenshot is None or isinstance(screenshot, Frame):
+            return screenshot
+        if isinstance(screenshot, str):
+            image = cv2.imread(screenshot)
+            return cls(image) if image is not None else None
+        return cls(screenshot)
+
+    @property
+    def image(self):
+        """The full frame in BGR channel order."""
+        if self._image is None:
+            self._image = cv2.cvtColor(self.raw, self.raw_conversion)
+        return self._image
+
+    @property
+    def shape(self):
+        if self._image is None:
+            return self.raw.shape[:2] + (3,)
+        return self._image.shape
+
+    @property
+    def height(self) -> int:
+        return self.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.shape[1]
+
+    @property
+    def gray(self):
+        """Single-channel grayscale view."""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def edges(self):
+        """Canny edge map of the grayscale view."""
+        if self._edges is None:
+            self._edges = cv2.Canny(self.gray, *EDGE_THRESHOLDS)
+        return self._edges
+
+    def pixels(self, xs, ys):
+        """BGR values at the given pixel coordinates, without converting the whole frame."""
+        if self._image is not None or self.raw is None:
+            return self.image[ys, xs]
+        return cv2.cvtColor(self.raw[ys, xs][None], self.raw_conversion)[0]
+
+    @property
+    def signature(self):
+        """Grayscale block averages over a coarse grid, for cheap change detection."""
+        if self._signature is None:
+            self._signature = cv2.resize(self.gray, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype("int16")
+        return self._signature
+
+    def changed_pixels(self, other, bbox=None, tolerance=PIXEL_TOLERANCE) -> int:
+        """Number of pixels within a box (default: the whole frame) whose grayscale changed by more than tolerance."""
+        if bbox is None:
+            bbox = (0, 0, self.width, self.height)
+        return int(cv2.countNonZero(cv2.threshold(cv2.absdiff(self.roi(bbox, "gray"), other.roi(bbox, "gray")),
+                                                  tolerance, 255, cv2.THRESH_BINARY)[1]))
+
+    def region_differs(self, other, bbox, tolerance=8.0) -> bool:
+        """Whether the mean grayscale difference to another frame within a box exceeds tolerance."""
+        return float(cv2.absdiff(self.roi(bbox, "gray"), other.roi(bbox, "gray")).mean()) > tolerance
+
+    def view(self, mode: str = "bgr"):
+        """The full frame in a match mode's representation ("bgr", "gray" or "edge")."""
+        if mode == "bgr":
+            return self.image
+        if mode == "gray":
+            return self.gray
+        if mode == "edge":
+            return self.edges
+        raise ValueError(f"Unknown match mode: {mode}")
+
+    def pyramid(self, level: int, mode: str = "bgr"):
+        """Frame view downscaled by 2**level (level 0 is the full frame)."""
+        if level == 0:
+            return self.view(mode)
+        pyramid = self._pyramids.setdefault(mode, [])
+        while len(pyramid) < level:
+            previous = pyramid[-1] if pyramid else self.view(mode)
+            pyramid.append(cv2.pyrDown(previous))
+        return pyramid[level - 1]
+
+    def roi(self, bbox: tuple[int, int, int, int], mode: str = "bgr"):
+        """Crop of a view for an (x1, y1, x2, y2) box; a view into the frame, not a copy."""
+        key = (tuple(bbox), mode)
+        if key not in self._rois:
+            x1, y1, x2, y2 = key[0]
+            self._rois[key] = self.view(mode)[y1:y2, x1:x2]
+        return self._rois[key]
@@ -0,0 +1,95 @@
+import collections
+import logging
+import threading
+import time
+
+
+class FrameSource:
+    """
+    Continuously captures screenshots on a background thread into a small ring buffer.
+
+    Each Frame carries the time.monotonic() value at which its capture started, so a
+    frame newer than T is guaranteed to show the screen as it was after T. Consumers
+    wait for such a frame instead of triggering their own capture, which lets capture
+    overlap with template matching and OCR.
+    """
+
+    def __init__(self, capture, buffer_size=4, min_interval=0.05):
+        """
+        Args:
+            capture: Callable returning a new Frame or None (e.g. ADBUtils.grab_frame)
+            buffer_size: Number of recent frames kept in the ring buffer
+            min_interval: Minimum time in seconds between capture starts
+        """
+        self.capture = capture
+        self.min_interval = min_interval
+        self.frames = collections.deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.capture_count = 0
+        self.failure_count = 0
+
+    def start(self):
+        """Start the capture thread (no-op if already running)."""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="frame-source", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the capture thread and wake up any waiting consumers."""
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def _run(self):
+        while self.running:
+            started = time.monotonic()
+            try:
+                frame = self.capture()
+            except Exception as e:
+                logging.error(f"Background capture failed: {e}")
+                frame = None
+
+            if frame is None:
+                self.failure_count += 1
+                time.sleep(1)
+                continue
+
+            with self.condition:
+                self.frames.append(frame)
+                self.capture_count += 1
+                self.condition.notify_all()
+
+            remaining = self.min_interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def latest(self, newer_than=None, timeout=5.0):
+        """
+        Return the most recent Frame, waiting for one newer than a given time.
+
+        Args:
+            newer_than: time.monotonic() value the frame must have been captured after
+                (None accepts any buffered frame)
+            timeout: Maximum time in seconds to wait for a suitable frame
+
+        Returns:
+            Frame: The latest frame, or None if no suitable frame arrived in time
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if self.frames:
+                    frame = self.frames[-1]
+                    if newer_than is None or frame.timestamp > newer_than:
+                        return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.running:
+                    return None
+                self.condition.wait(remaining)
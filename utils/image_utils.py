@@ -2,12 +2,55 @@ import cv2
 import numpy as np
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from utils.debug_utils import DebugVisualizer
+from utils.fingerprints import get_fingerprints
+from utils.frame import Frame
+from utils.latency import get_latency_model
+from utils.regions import region_bbox
+from utils.template_registry import get_template_registry
 
 class ImageUtils:
+    # Shared by all instances; cv2.matchTemplate releases the GIL so matches run in parallel
+    match_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="match")
+    # Pixels around a template's last position searched before its region or the full frame
+    TRACK_WINDOW = 8
+    # Coarse-to-fine matching: pyramid level searched first, number of coarse peaks refined
+    # at full resolution, and the smallest template side allowed at the coarse level
+    PYRAMID_LEVEL = 1
+    PYRAMID_CANDIDATES = 3
+    PYRAMID_MIN_SIZE = 12
+    # Longest gap in seconds between an action and a wait_for call for the wait to time the action
+    ACTION_WAIT_GAP = 2.0
+    # A cached match is stale once this share of the template's area changed in its search box
+    CACHE_CHANGE_FRACTION = 0.05
+    # Distinct frames the match cache keeps results for
+    CACHE_FRAMES = 4
+
     def __init__(self):
         self.debugger = DebugVisualizer()
+        self.templates = get_template_registry()
+        self.fingerprints = get_fingerprints()
         self.logged_messages = set()  # Set to track logged messages
+        # Last match position of each template, checked first on the next call
+        self.last_positions = {}
+        # How often the tracked position / search region was enough vs. needed a wider search
+        self.tracker_hits = 0
+        self.tracker_misses = 0
+        self.region_hits = 0
+        self.region_misses = 0
+        # Presence checks answered by pixel probes vs. left to template matching
+        self.fingerprint_answers = 0
+        self.fingerprint_ambiguous = 0
+        # Match results per template with the frame they were found on, reused while the
+        # template's search box is unchanged
+        self.cache_lock = threading.Lock()
+        self.match_cache = {}
+        self.matches_saved = 0
+        # Seconds from an action to the state wait_for detected, per transition
+        self.latency = get_latency_model()
 
     def log_once(self, message):
         """Log a message only once."""
@@ -15,41 +58,246 @@ class ImageUtils:
             logging.info(message)
             self.logged_messages.add(message)
 
-    def find_image(self, screenshot_path: str, template_path: str) -> tuple[tuple[int, int] | None, float]:
+    def get_template(self, template, image_folder: str = None):
+        """
+        Resolve a template given as a registry key, a Template, or an image name within a folder.
+        Returns the Template, or None if it does not exist.
+        """
+        if image_folder is not None and not (isinstance(template, str) and template in self.templates):
+            template = os.path.join(image_folder, template)
+        return self.templates.get(template)
+
+    @staticmethod
+    def match_template(image, template) -> tuple[tuple[int, int], float]:
+        """
+        Return the best match location and its TM_CCOEFF_NORMED score (0-1.0).
+        The image must be in the template's match mode (see Frame.view).
+        """
+        result = cv2.matchTemplate(image, template.view(), cv2.TM_CCOEFF_NORMED)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        return max_loc, max_val
+
+    def match_in(self, frame, template, bbox) -> tuple[tuple[int, int], float]:
+        """Match a template within an (x1, y1, x2, y2) box of a Frame; the location is in frame coordinates."""
+        (x, y), max_val = self.match_template(frame.roi(bbox, template.mode), template)
+        return (x + bbox[0], y + bbox[1]), max_val
+
+    def coarse_level(self, template, bbox) -> int:
+        """Deepest pyramid level (up to PYRAMID_LEVEL) at which the template is still usable."""
+        x1, y1, x2, y2 = bbox
+        level = self.PYRAMID_LEVEL
+        while level > 0 and min(template.width, template.height) >> level < self.PYRAMID_MIN_SIZE:
+            level -= 1
+        # Small boxes are cheaper to match directly than to refine several peaks
+        if (x2 - x1) * (y2 - y1) < 16 * template.width * template.height:
+            return 0
+        return level
+
+    def match_coarse_to_fine(self, frame, template, bbox=None) -> tuple[tuple[int, int], float]:
+        """
+        Match a template within a box of a Frame using the image pyramids.
+        Candidate peaks are found on the downscaled frame and template, then only small
+        full-resolution windows around them are matched, so the location and confidence
+        mean the same as with match_in.
+        """
+        if bbox is None:
+            bbox = (0, 0, frame.width, frame.height)
+        level = self.coarse_level(template, bbox)
+        if level == 0:
+            return self.match_in(frame, template, bbox)
+
+        scale = 1 << level
+        x1, y1, x2, y2 = bbox
+        coarse = frame.pyramid(level, template.mode)[y1 // scale:y2 // scale, x1 // scale:x2 // scale]
+        coarse_template = template.pyramid(level)
+        result = cv2.matchTemplate(coarse, coarse_template, cv2.TM_CCOEFF_NORMED)
+
+        best_loc, best_val = None, -1.0
+        pad = scale + 2
+        suppress_h, suppress_w = coarse_template.shape[0] // 2, coarse_template.shape[1] // 2
+        for _ in range(self.PYRAMID_CANDIDATES):
+            _, peak_val, _, (px, py) = cv2.minMaxLoc(result)
+            if peak_val <= -1.0:
+                break
+            x = min((x1 // scale + px) * scale, x2 - template.width)
+            y = min((y1 // scale + py) * scale, y2 - template.height)
+            window = (max(x1, x - pad), max(y1, y - pad),
+                      min(x2, x + template.width + pad), min(y2, y + template.height + pad))
+            loc, val = self.match_in(frame, template, window)
+            if val > best_val:
+                best_loc, best_val = loc, val
+            # Suppress this peak so the next candidate is a different place
+            result[max(0, py - suppress_h):py + suppress_h + 1, max(0, px - suppress_w):px + suppress_w + 1] = -1.0
+        return best_loc, best_val
+
+    def tracking_window(self, frame, template, position) -> tuple[int, int, int, int]:
+        """Box around the template's last position, TRACK_WINDOW pixels wider on every side."""
+        x, y = position
+        return (max(0, x - self.TRACK_WINDOW),
+                max(0, y - self.TRACK_WINDOW),
+                min(frame.width, x + template.width + self.TRACK_WINDOW),
+                min(frame.height, y + template.height + self.TRACK_WINDOW))
+
+    def locate(self, frame, template, confidence_threshold=0.8) -> tuple[tuple[int, int], float]:
+        """
+        Find the best match of a template in a Frame, reusing the result from an earlier
+        frame if nothing changed where the template is searched (see cache_box).
+        Returns the best match location and its confidence (0-1.0).
+        """
+        key = (template.key, confidence_threshold)
+        with self.cache_lock:
+            cached = self.match_cache.get(key)
+        if cached is not None:
+            cached_frame, box, result = cached
+            if cached_frame is frame or (
+                    (cached_frame.width, cached_frame.height) == (frame.width, frame.height)
+                    and frame.changed_pixels(cached_frame, box)
+                    <= self.CACHE_CHANGE_FRACTION * template.width * template.height):
+                with self.cache_lock:
+                    self.matches_saved += 1
+                return result
+
+        result = self.search(frame, template, confidence_threshold)
+        with self.cache_lock:
+            self.match_cache[key] = (frame, self.cache_box(frame, template, result[0]), result)
+            frames = {id(entry[0]): entry[0] for entry in self.match_cache.values()}
+            if len(frames) > self.CACHE_FRAMES:
+                oldest = min(frames.values(), key=lambda f: f.timestamp)
+                self.match_cache = {k: entry for k, entry in self.match_cache.items() if entry[0] is not oldest}
+        return result
+
+    def cache_box(self, frame, template, position) -> tuple[int, int, int, int]:
+        """
+        Box that must stay unchanged for a cached match to hold: the template's search region
+        if the match lies in it (or there was none), the whole frame otherwise.
+        """
+        if template.region is not None:
+            box = region_bbox(template.region, frame.width, frame.height, template.size)
+            x1, y1, x2, y2 = box
+            if position is None or (x1 <= position[0] and y1 <= position[1]
+                                    and position[0] + template.width <= x2 and position[1] + template.height <= y2):
+                return box
+        return 0, 0, frame.width, frame.height
+
+    def search(self, frame, template, confidence_threshold=0.8) -> tuple[tuple[int, int], float]:
+        """
+        Find the best match of a template in a Frame.
+        The search widens only on a miss: first a tiny window around the template's last
+        position, then its search region (see utils/regions.py), then the full frame.
+        Returns the best match location and its confidence (0-1.0).
+        """
+        position = self.last_positions.get(template.key)
+        if position is not None:
+            max_loc, max_val = self.match_in(frame, template, self.tracking_window(frame, template, position))
+            if max_val >= confidence_threshold:
+                self.tracker_hits += 1
+                self.last_positions[template.key] = max_loc
+                return max_loc, max_val
+            self.tracker_misses += 1
+
+        max_loc = None
+        if template.region is not None:
+            bbox = region_bbox(template.region, frame.width, frame.height, template.size)
+            max_loc, max_val = self.match_coarse_to_fine(frame, template, bbox)
+            if max_val >= confidence_threshold:
+                self.region_hits += 1
+            else:
+                self.region_misses += 1
+                max_loc = None
+        if max_loc is None:
+            max_loc, max_val = self.match_coarse_to_fine(frame, template)
+
+        if max_val >= confidence_threshold:
+            self.last_positions[template.key] = max_loc
+        return max_loc, max_val
+
+    def match_stats(self) -> dict:
+        """Counters showing how often each stage of locate() was enough."""
+        return {
+            "tracker_hits": self.tracker_hits,
+            "tracker_misses": self.tracker_misses,
+            "region_hits": self.region_hits,
+            "region_misses": self.region_misses,
+            "fingerprint_answers": self.fingerprint_answers,
+            "fingerprint_ambiguous": self.fingerprint_ambiguous,
+            "matches_saved": self.matches_saved,
+        }
+
+    def check_fingerprint(self, frame, template, confidence_threshold=None) -> bool | None:
+        """
+        Answer whether a template is shown from its pixel-probe fingerprint (utils/fingerprints.py).
+        Returns None if the template has no fingerprint, the fingerprint was not validated on
+        held-out captures, the probes are ambiguous, or the caller asks for a higher match
+        confidence than the fingerprint stands for.
+        """
+        fingerprint = self.fingerprints.get(template.key)
+        if fingerprint is None:
+            return None
+        if confidence_threshold is not None and confidence_threshold > fingerprint.confidence:
+            return None
+        shown = fingerprint.check(frame)
+        if shown is None:
+            self.fingerprint_ambiguous += 1
+        else:
+            self.fingerprint_answers += 1
+        return shown
+
+    def is_shown(self, frame, template, confidence_threshold=0.8) -> bool:
+        """Whether a template is on a Frame: its fingerprint if decisive, a template match otherwise."""
+        shown = self.check_fingerprint(frame, template, confidence_threshold)
+        if shown is None:
+            _, max_val = self.locate(frame, template, confidence_threshold)
+            shown = max_val >= confidence_threshold
+        return shown
+
+    def probe(self, frame, template, confidence_threshold=0.8) -> bool | None:
+        """
+        Whether a template is on a Frame, from the cheap checks only: its fingerprint, then a
+        match within its search region. Returns None if neither applies, so the caller can
+        decide whether a full-frame match is worth it.
+        """
+        shown = self.check_fingerprint(frame, template, confidence_threshold)
+        if shown is not None or template.region is None:
+            return shown
+        bbox = region_bbox(template.region, frame.width, frame.height, template.size)
+        _, max_val = self.match_coarse_to_fine(frame, template, bbox)
+        return max_val >= confidence_threshold
+
+    def find_image(self, screenshot, template) -> tuple[tuple[int, int] | None, float]:
         """
         Find a template image within a screenshot.
+        The screenshot can be a Frame, a BGR array or a file path.
+        The template can be a registry key, a Template or a file path.
         Returns tuple of ((x, y), match_percentage) if found, (None, 0.0) otherwise.
         """
         try:
             # Read the images
-            screenshot = cv2.imread(screenshot_path)
-            template = cv2.imread(template_path)
+            frame = Frame.wrap(screenshot)
+            template = self.get_template(template)
             
-            if screenshot is None or template is None:
+            if frame is None or template is None:
                 self.log_once("Failed to load images")
                 return None, 0.0
 
             # Perform template matching
-            result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-            
-            # Create debug visualization
-            self.debugger.load_screenshot(screenshot_path)
             match_threshold = 0.8
+            max_loc, max_val = self.locate(frame, template, match_threshold)
+            
             matched = max_val > match_threshold
             match_percentage = max_val * 100
             
-            # Draw detection box on result
-            template_name = os.path.basename(template_path)
-            confidence_text = f"{template_name} ({match_percentage:.1f}%)"
-            
-            if matched:
-                self.debugger.draw_detection(max_loc, template.shape[:2], confidence_text, color=(0, 255, 0))
-            else:
-                self.debugger.draw_detection(max_loc, template.shape[:2], confidence_text, color=(0, 0, 255))
+            # Create debug visualization (skipped entirely when debugging is off)
+            if self.debugger.sink.enabled:
+                self.debugger.load_screenshot(frame)
+                confidence_text = f"{template.name} ({match_percentage:.1f}%)"
                 
-            # Save the visualization
-            self.debugger.save_visualization("result.png")
+                if matched:
+                    self.debugger.draw_detection(max_loc, template.size, confidence_text, color=(0, 255, 0))
+                else:
+                    self.debugger.draw_detection(max_loc, template.size, confidence_text, color=(0, 0, 255))
+                    
+                # Save the visualization
+                self.debugger.save_visualization("result.png", failed=not matched)
 
             # If the match is good enough, return the position and match percentage
             if matched:  # Threshold for matching
@@ -61,25 +309,28 @@ class ImageUtils:
             return None, 0.0
 
     def find_and_click_image(self, adb_utils, image_folder: str, image_name: str, 
-                             confidence_threshold=0.7, center_click=True) -> bool:
+                             confidence_threshold=0.7, center_click=True, frame=None) -> bool:
         """
         Find an image on screen and click on it if found.
         
         Args:
             adb_utils: Instance of ADBUtils for screenshot and clicking
-            image_folder: Path to folder containing template images
-            image_name: Name of the image file to find
+            image_folder: Path to folder containing template images (None if image_name is a registry key)
+            image_name: Name of the image file to find, or a template registry key
             confidence_threshold: Minimum match confidence (0-1.0)
             center_click: If True, click center of image; if False, click top-left
+            frame: Already captured Frame to search (a new screenshot is taken if None)
             
         Returns:
             bool: True if image was found and clicked, False otherwise
         """
-        if not adb_utils.take_screenshot("screen.png"):
+        if frame is None:
+            frame = adb_utils.capture_frame()
+        if frame is None:
             return False
             
-        image_path = os.path.join(image_folder, image_name)
-        pos, match_percentage = self.find_image("screen.png", image_path)
+        template = self.get_template(image_name, image_folder)
+        pos, match_percentage = self.find_image(frame, template)
         
         # Log the confidence value regardless of success
         confidence = match_percentage / 100
@@ -87,17 +338,10 @@ class ImageUtils:
         
         if pos and confidence >= confidence_threshold:
             if center_click:
-                # Get the image dimensions to click in center
-                template = cv2.imread(image_path)
-                if template is not None:
-                    h, w = template.shape[:2]
-                    center_x = pos[0] + w // 2
-                    center_y = pos[1] + h // 2
-                    self.log_once(f"Clicking {image_name} at center position ({center_x}, {center_y})")
-                    adb_utils.humanlike_click(center_x, center_y)
-                else:
-                    self.log_once(f"Clicking {image_name} at detection position {pos}")
-                    adb_utils.humanlike_click(*pos)
+                # Click in the center of the template
+                center_x, center_y = template.center(pos)
+                self.log_once(f"Clicking {image_name} at center position ({center_x}, {center_y})")
+                adb_utils.humanlike_click(center_x, center_y)
             else:
                 self.log_once(f"Clicking {image_name} at detection position {pos}")
                 adb_utils.humanlike_click(*pos)
@@ -107,8 +351,11 @@ class ImageUtils:
     def find_and_click_image_now(self, adb_utils, image_folder: str, image_name: str, 
                                     confidence_threshold=0.7, center_click=True) -> bool:
             
-                image_path = os.path.join(image_folder, image_name)
-                pos, match_percentage = self.find_image("screen.png", image_path)
+                if adb_utils.last_frame is None:
+                    return False
+
+                template = self.get_template(image_name, image_folder)
+                pos, match_percentage = self.find_image(adb_utils.last_frame, template)
                 
                 # Log the confidence value regardless of success
                 confidence = match_percentage / 100
@@ -116,17 +363,10 @@ class ImageUtils:
                 
                 if pos and confidence >= confidence_threshold:
                     if center_click:
-                        # Get the image dimensions to click in center
-                        template = cv2.imread(image_path)
-                        if template is not None:
-                            h, w = template.shape[:2]
-                            center_x = pos[0] + w // 2
-                            center_y = pos[1] + h // 2
-                            self.log_once(f"Clicking {image_name} at center position ({center_x}, {center_y})")
-                            adb_utils.humanlike_click(center_x, center_y)
-                        else:
-                            self.log_once(f"Clicking {image_name} at detection position {pos}")
-                            adb_utils.humanlike_click(*pos)
+                        # Click in the center of the template
+                        center_x, center_y = template.center(pos)
+                        self.log_once(f"Clicking {image_name} at center position ({center_x}, {center_y})")
+                        adb_utils.humanlike_click(center_x, center_y)
                     else:
                         self.log_once(f"Clicking {image_name} at detection position {pos}")
                         adb_utils.humanlike_click(*pos)
@@ -136,23 +376,153 @@ class ImageUtils:
                 return False
 
            
-    def detect_image(self, adb_utils, image_folder: str, image_name: str, confidence_threshold=0.7) -> bool:
+    def detect_image(self, adb_utils, image_folder: str, image_name: str, confidence_threshold=0.7, frame=None) -> bool:
         """
         Just detect an image on screen without clicking.
         
         Args:
             adb_utils: Instance of ADBUtils for screenshot
-            image_folder: Path to folder containing template images
-            image_name: Name of the image file to find
+            image_folder: Path to folder containing template images (None if image_name is a registry key)
+            image_name: Name of the image file to find, or a template registry key
             confidence_threshold: Minimum match confidence (0-1.0)
+            frame: Already captured Frame to search (a new screenshot is taken if None)
             
         Returns:
             bool: True if image was found, False otherwise
         """
-        if not adb_utils.take_screenshot("screen.png"):
+        if frame is None:
+            frame = adb_utils.capture_frame()
+        if frame is None:
             return False
-            
-        image_path = os.path.join(image_folder, image_name)
-        pos, match_percentage = self.find_image("screen.png", image_path)
+
+        template = self.get_template(image_name, image_folder)
+        if template is not None:
+            frame = Frame.wrap(frame)
+            shown = self.check_fingerprint(frame, template, confidence_threshold)
+            if shown is not None:
+                return shown
+
+        pos, match_percentage = self.find_image(frame, template)
         
         return pos is not None and match_percentage/100 >= confidence_threshold
+
+    def detect_many(self, frame, templates, image_folder: str = None, confidence_threshold=0.8) -> dict:
+        """
+        Match several templates against one frame, spreading the matches over a thread pool.
+        
+        Args:
+            frame: Frame (or BGR array / image path) to search
+            templates: Image names in image_folder, registry keys or Templates
+            image_folder: Folder the image names are relative to (None for registry keys)
+            confidence_threshold: Minimum match confidence (0-1.0) for a position to be reported
+            
+        Returns:
+            dict: {template: (position or None, confidence 0-1.0)} in the order given
+        """
+        frame = Frame.wrap(frame)
+        if frame is None:
+            return {name: (None, 0.0) for name in templates}
+
+        resolved = {name: self.get_template(name, image_folder) for name in templates}
+        # Templates whose validated fingerprint rules them out need no match; shown ones are matched for their position
+        absent = {name for name, template in resolved.items()
+                  if template is not None and self.check_fingerprint(frame, template, confidence_threshold) is False}
+        futures = {
+            name: self.match_pool.submit(self.locate, frame, template, confidence_threshold)
+            for name, template in resolved.items() if template is not None and name not in absent
+        }
+
+        results = {}
+        debugging = self.debugger.sink.enabled
+        if debugging:
+            self.debugger.load_screenshot(frame)
+        for name, template in resolved.items():
+            if template is None:
+                self.log_once(f"Template not found: {name}")
+                results[name] = (None, 0.0)
+                continue
+            if name in absent:
+                results[name] = (None, 0.0)
+                continue
+
+            max_loc, max_val = futures[name].result()
+            matched = max_val >= confidence_threshold
+            results[name] = (max_loc if matched else None, max_val)
+            if debugging:
+                self.debugger.draw_detection(max_loc, template.size, f"{template.name} ({max_val * 100:.1f}%)",
+                                             color=(0, 255, 0) if matched else (0, 0, 255))
+        if debugging:
+            self.debugger.save_visualization("result.png", failed=not any(pos for pos, _ in results.values()))
+        return results
+
+    def wait_for(self, adb_utils, any_of=(), none_of=(), all_of=(), image_folder: str = None, timeout=10.0,
+                 confidence_threshold=0.8, min_interval=0.05, max_interval=1.0, transition=None):
+        """
+        Poll the screen until a target state appears.
+
+        The state is reached when any template of any_of is shown (if given), every template
+        of all_of is shown and no template of none_of is shown. Polling starts fast and backs
+        off (each pause 1.5x the previous) up to max_interval, so quick transitions are caught
+        right after an action and long waits do not burn CPU. Right after an action, the first
+        poll waits until the transition's fastest usual latency (LatencyModel.first_poll), and
+        a timeout is recorded as a censored latency sample.
+
+        Args:
+            adb_utils: Instance of ADBUtils providing frames (from its frame source if running)
+            any_of / none_of / all_of: Image names in image_folder, registry keys, Templates, or
+                callables taking a Frame and returning whether it shows the state
+            image_folder: Folder the image names are relative to (None for registry keys)
+            timeout: Maximum time to wait in seconds
+            confidence_threshold: Minimum match confidence (0-1.0)
+            min_interval / max_interval: First and longest pause between polls in seconds
+            transition: Name the latency is recorded under (default: the any_of name found, or
+                the only any_of name on timeout)
+
+        Returns:
+            tuple: (the any_of name that was found, or True if any_of is empty, or None on
+                    timeout; the last Frame inspected)
+        """
+        resolve = lambda names: [(name, name if callable(name) else self.get_template(name, image_folder))
+                                 for name in names]
+        any_of, none_of, all_of = resolve(any_of), resolve(none_of), resolve(all_of)
+        for name, template in any_of + none_of + all_of:
+            if template is None:
+                self.log_once(f"Template not found: {name}")
+
+        start = time.monotonic()
+        # Transitions are timed from the action that triggered them
+        since = adb_utils.last_action_time or start
+        # Only waits started right after an action time that action's transition
+        timed = start - since <= self.ACTION_WAIT_GAP
+        expected = transition
+        if expected is None and len(any_of) == 1 and isinstance(any_of[0][0], str):
+            expected = any_of[0][0]
+        if timed and expected is not None:
+            delay = min(since + self.latency.first_poll(expected) - start, timeout)
+            if delay > 0:
+                time.sleep(delay)
+        interval = min_interval
+        frame = None
+        while True:
+            frame = adb_utils.capture_frame()
+            if frame is not None:
+                shown = lambda template: template is not None and (
+                    template(frame) if callable(template) else self.is_shown(frame, template, confidence_threshold))
+                found = next((name for name, template in any_of if shown(template)), None) if any_of else True
+                if (found is not None and all(shown(template) for _, template in all_of)
+                        and not any(shown(template) for _, template in none_of)):
+                    elapsed = time.monotonic() - since
+                    label = transition or (found if isinstance(found, str) else "target state")
+                    if label != "target state" and timed:
+                        self.latency.record(label, elapsed)
+                    logging.info(f"⏱️ Reached {label} {elapsed:.2f}s after last action")
+                    return found, frame
+
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                logging.info(f"⌛ Target state not reached within {timeout:.1f}s")
+                if timed and expected is not None:
+                    self.latency.record(expected, time.monotonic() - since, timed_out=True)
+                return None, frame
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, max_interval)
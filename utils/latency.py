@@ -0,0 +1,150 @@
+"""
+Learned UI transition latencies.
+
+Every time wait_for sees the screen reach a state after an action, the time from the
+action to that state is recorded under the transition's name (e.g. "find_match.png").
+A wait that times out is recorded too, as a censored sample: the transition took at
+least that long. Censored samples count towards the p95, so a device slower than the
+current budget raises it, while timeouts stay at least the caller's default (see
+timeout). The samples are kept per device in latency.json in the working directory
+(farm.py gives every device its own), so delays adapt to the device instead of being
+guessed constants.
+"""
+import json
+import logging
+import os
+import threading
+
+LATENCY_FILE = "latency.json"
+
+
+class LatencyModel:
+    """Per-transition latency samples with a p95-based delay budget."""
+
+    # Timeouts are this many budgets, so a transition slower than the budget is still seen
+    TIMEOUT_FACTOR = 2.0
+
+    def __init__(self, path=LATENCY_FILE, max_samples=200, save_every=10):
+        """
+        Args:
+            path: JSON file the samples are loaded from and saved to (None: not persisted)
+            max_samples: Most recent samples kept per transition
+            save_every: Save after this many new samples
+        """
+        self.path = path
+        self.max_samples = max_samples
+        self.save_every = save_every
+        self.lock = threading.Lock()
+        self.samples = {}
+        # Waits that timed out: lower bounds of the transition's latency
+        self.censored = {}
+        self.unsaved = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                if "samples" not in data:
+                    data = {"samples": data}  # Written before censored samples were kept
+                self.samples = {name: [float(s) for s in values] for name, values in data["samples"].items()}
+                self.censored = {name: [float(s) for s in values] for name, values in data.get("censored", {}).items()}
+            except (OSError, ValueError, AttributeError) as e:
+                logging.warning(f"⚠️ Could not read latencies from {path}: {e}")
+
+    def record(self, transition: str, seconds: float, timed_out=False):
+        """
+        Add one observed latency for a transition.
+
+        Args:
+            transition: Transition name
+            seconds: Time from the action to the state, or waited before giving up
+            timed_out: The state was not reached: the latency is at least seconds
+        """
+        with self.lock:
+            samples = (self.censored if timed_out else self.samples).setdefault(transition, [])
+            samples.append(round(seconds, 3))
+            del samples[:-self.max_samples]
+            self.unsaved += 1
+            save = self.unsaved >= self.save_every
+        if save:
+            self.save()
+
+    def percentile(self, transition: str, q: float, censored=True) -> float | None:
+        """
+        The q-th percentile (0-100) of a transition's samples, or None without samples.
+        Censored samples count at the time waited unless censored is False.
+        """
+        with self.lock:
+            samples = list(self.samples.get(transition, ()))
+            if censored:
+                samples += self.censored.get(transition, ())
+        if not samples:
+            return None
+        samples.sort()
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+    def count(self, transition: str) -> int:
+        with self.lock:
+            return len(self.samples.get(transition, ())) + len(self.censored.get(transition, ()))
+
+    def budget(self, transition: str, default: float, margin=0.25, min_samples=5) -> float:
+        """
+        Time a transition is expected to take: its p95 latency (timeouts included) plus a
+        margin once at least min_samples were recorded, the given default until then.
+        """
+        if self.count(transition) < min_samples:
+            return default
+        return self.percentile(transition, 95) + margin
+
+    def timeout(self, transition: str, default: float, margin=0.25, min_samples=5) -> float:
+        """
+        How long to wait for a transition before giving up: TIMEOUT_FACTOR budgets, but
+        never less than the default. Waits that still time out raise the budget.
+        """
+        if self.count(transition) < min_samples:
+            return default
+        return max(default, self.TIMEOUT_FACTOR * self.budget(transition, default, margin, min_samples))
+
+    def first_poll(self, transition: str, q=10, min_samples=5) -> float:
+        """
+        Seconds after the action before the state is worth checking: the q-th percentile of
+        the latencies actually observed (0 until min_samples were observed).
+        """
+        with self.lock:
+            count = len(self.samples.get(transition, ()))
+        if count < min_samples:
+            return 0.0
+        return self.percentile(transition, q, censored=False)
+
+    def save(self):
+        """Write the samples to disk."""
+        if not self.path:
+            return
+        with self.lock:
+            data = json.dumps({"samples": self.samples, "censored": self.censored}, indent=1, sort_keys=True)
+            self.unsaved = 0
+        try:
+            with open(self.path, "w") as f:
+                f.write(data)
+        except OSError as e:
+            logging.warning(f"⚠️ Could not save latencies to {self.path}: {e}")
+
+    def summary(self) -> dict:
+        """{transition: (sample count, timeouts, median, p95)} for logging; timeouts count at the time waited."""
+        with self.lock:
+            names = set(self.samples) | set(self.censored)
+            timeouts = {name: len(self.censored.get(name, ())) for name in names}
+        return {name: (self.count(name), timeouts[name], self.percentile(name, 50), self.percentile(name, 95))
+                for name in names}
+
+
+_latency_model = None
+_latency_lock = threading.Lock()
+
+
+def get_latency_model() -> LatencyModel:
+    """Return the process-wide latency model, loading it on first use."""
+    global _latency_model
+    with _latency_lock:
+        if _latency_model is None:
+            _latency_model = LatencyModel()
+        return _latency_model
@@ -0,0 +1,295 @@
+"""
+Reading loot numbers from the scouting screen.
+
+DigitRecognizer reads the game's fixed digit font in-process: it splits a crop into
+glyphs and correlates each one against a bundled glyph set with a single NumPy matrix
+product. It is opt-in (SearchSequence(use_recognizer=True)) until benchmarks/bench_ocr
+has measured it on loot crops from several scouted bases. TesseractEngine, which reads
+every loot number by default and the recognizer's unsure crops otherwise, keeps
+one Tesseract engine loaded (through tesserocr's C API when it is installed) and reads
+several crops in one request by stacking them into one image, one line per crop.
+tesseract_digits is the previous reader (three Tesseract runs per crop).
+
+Add glyphs from a crop whose value is known:
+    python -m utils.ocr add crop.png 1774422
+    python -m utils.ocr add screenshot.png 1774422 --bbox 95 95 220 120
+"""
+import argparse
+import glob
+import logging
+import os
+import threading
+import cv2
+import numpy as np
+import pytesseract
+
+try:
+    import tesserocr
+    from PIL import Image
+except ImportError:
+    tesserocr = None
+
+GLYPH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "search_sequence", "glyphs")
+
+# Normalized glyph size (height, width); glyphs are scaled to the height keeping their aspect
+GLYPH_SIZE = (16, 12)
+# Gray level above which a pixel belongs to the (white) digit fill
+FILL_THRESHOLD = 200
+# Correlation every glyph of a crop must reach for the reading to be trusted
+MIN_CONFIDENCE = 0.75
+
+DIGIT_WHITELIST = "0123456789"
+
+
+def tesseract_digits(img) -> str:
+    """Read digits with Tesseract (three page segmentation modes, most frequent answer wins)."""
+    # Use custom digits-trained config
+    custom_config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789'
+
+    # Try multiple approaches
+    results = []
+    try:
+        # Attempt with custom traineddata if available
+        results.append(pytesseract.image_to_string(img, config=custom_config, lang='digits'))
+    except:
+        # Fallback to default
+        results.append(pytesseract.image_to_string(img, config=custom_config))
+
+    # Alternative PSM modes
+    for psm in [8, 13]:
+        results.append(pytesseract.image_to_string(
+            img,
+            config=f'--oem 3 --psm {psm} -c tessedit_char_whitelist=0123456789'
+        ))
+
+    # Select the most frequent valid result
+    valid_results = [r.strip() for r in results if any(c.isdigit() for c in r)]
+    if valid_results:
+        return max(set(valid_results), key=valid_results.count)
+    return ""
+
+
+def stack_lines(images, gap=None) -> np.ndarray:
+    """
+    Stack gray crops into one image, one crop per text line.
+    Crops are left-aligned and padded with their own background level (the median), and
+    separated by blank rows so Tesseract's layout analysis keeps them on separate lines.
+    """
+    height = max(image.shape[0] for image in images)
+    width = max(image.shape[1] for image in images)
+    gap = gap if gap is not None else height // 2
+    rows = []
+    for image in images:
+        background = int(np.median(image))
+        row = np.full((image.shape[0] + gap, width), background, dtype=np.uint8)
+        row[gap // 2:gap // 2 + image.shape[0], :image.shape[1]] = image
+        rows.append(row)
+    return np.vstack(rows)
+
+
+class TesseractEngine:
+    """
+    Tesseract kept loaded for the life of the bot, reading a batch of digit crops per call.
+
+    With tesserocr installed (see the README), one engine is initialized once through the
+    C API. Without it every batch is still a single tesseract run (one process and one
+    model load per batch instead of three per crop), and a warning says so at startup. If the lines Tesseract returns cannot be matched to
+    the crops one to one, the batch is read crop by crop with tesseract_digits.
+    """
+
+    def __init__(self, lang="digits"):
+        self.lock = threading.Lock()
+        self.lang = lang
+        self.api = None
+        self.batches = 0
+        self.split_batches = 0  # Batches that had to be read crop by crop
+        if tesserocr is not None:
+            for language in (lang, "eng"):
+                try:
+                    self.api = tesserocr.PyTessBaseAPI(lang=language, psm=tesserocr.PSM.SINGLE_BLOCK)
+                    self.api.SetVariable("tessedit_char_whitelist", DIGIT_WHITELIST)
+                    self.lang = language
+                    break
+                except RuntimeError:
+                    continue
+        if self.api is not None:
+            logging.info(f"🔤 Tesseract engine: tesserocr ({self.lang}), loaded once")
+        elif tesserocr is None:
+            logging.warning("⚠️ tesserocr is not installed: every Tesseract batch starts a new tesseract "
+                            "process. Install tesserocr to keep one engine loaded")
+        else:
+            logging.warning(f"⚠️ tesserocr could not load the '{lang}' or 'eng' model: every Tesseract batch "
+                            "starts a new tesseract process")
+
+    def read_text(self, image) -> str:
+        """Run Tesseract once on an image laid out as a block of lines."""
+        if self.api is not None:
+            self.api.SetImage(Image.fromarray(image))
+            return self.api.GetUTF8Text()
+        config = f'--oem 3 --psm 6 -c tessedit_char_whitelist={DIGIT_WHITELIST}'
+        if self.lang:
+            try:
+                return pytesseract.image_to_string(image, config=config, lang=self.lang)
+            except pytesseract.TesseractError:
+                # Custom traineddata not installed: use the default model from now on
+                logging.info(f"Tesseract language '{self.lang}' not available, using the default")
+                self.lang = None
+        return pytesseract.image_to_string(image, config=config)
+
+    def read_lines(self, images) -> list[str]:
+        """
+        Read the digits of several gray crops (dark text on a light background) in one request.
+
+        Returns:
+            list: The text read from each crop, in order
+        """
+        if not images:
+            return []
+        with self.lock:
+            self.batches += 1
+            text = self.read_text(stack_lines(images))
+            lines = [line.strip() for line in text.splitlines() if any(c.isdigit() for c in line)]
+            if len(lines) == len(images):
+                return lines
+            self.split_batches += 1
+            logging.info(f"Tesseract returned {len(lines)} lines for {len(images)} crops, reading them one by one")
+            return [tesseract_digits(image) for image in images]
+
+
+_tesseract_engine = None
+_tesseract_lock = threading.Lock()
+
+
+def get_tesseract_engine() -> TesseractEngine:
+    """Return the process-wide Tesseract engine, starting it on first use."""
+    global _tesseract_engine
+    with _tesseract_lock:
+        if _tesseract_engine is None:
+            _tesseract_engine = TesseractEngine()
+        return _tesseract_engine
+
+
+def segment_glyphs(crop) -> list:
+    """
+    Split a loot number crop (BGR or gray) into glyph masks, left to right.
+    Glyphs are the connected white fills at least half as tall as the tallest one, which
+    drops specks of bright background.
+    """
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    mask = (gray >= FILL_THRESHOLD).astype(np.uint8)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = [stats[i, :4] for i in range(1, count) if stats[i, cv2.CC_STAT_AREA] >= 4]
+    if not boxes:
+        return []
+    tallest = max(h for _, _, _, h in boxes)
+    boxes = sorted((b for b in boxes if b[3] >= tallest / 2), key=lambda b: b[0])
+    return [mask[y:y + h, x:x + w] for x, y, w, h in boxes]
+
+
+def normalize_glyph(mask) -> np.ndarray:
+    """Scale a glyph mask to GLYPH_SIZE height, centre it and return it as a float image."""
+    height, width = GLYPH_SIZE
+    h, w = mask.shape
+    scaled_width = max(1, min(width, round(w * height / h)))
+    scaled = cv2.resize(mask.astype(np.float32), (scaled_width, height), interpolation=cv2.INTER_AREA)
+    glyph = np.zeros(GLYPH_SIZE, dtype=np.float32)
+    left = (width - scaled_width) // 2
+    glyph[:, left:left + scaled_width] = scaled
+    return glyph
+
+
+def glyph_vectors(glyphs) -> np.ndarray:
+    """Zero-mean, unit-length rows, so a dot product is the normalized correlation."""
+    vectors = np.array([g.ravel() for g in glyphs], dtype=np.float32)
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+
+class DigitRecognizer:
+    """Template-correlation reader for the loot digit font (glyph images in GLYPH_DIR)."""
+
+    def __init__(self, glyph_dir=GLYPH_DIR, min_confidence=MIN_CONFIDENCE):
+        self.glyph_dir = glyph_dir
+        self.min_confidence = min_confidence
+        self.labels = []
+        glyphs = []
+        for path in sorted(glob.glob(os.path.join(glyph_dir, "*.png"))):
+            image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                continue
+            # File names are "<digit>_<n>.png"
+            self.labels.append(os.path.basename(path)[0])
+            glyphs.append(cv2.resize(image, GLYPH_SIZE[::-1]).astype(np.float32) / 255)
+        self.labels = np.array(self.labels)
+        self.vectors = glyph_vectors(glyphs) if glyphs else np.zeros((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), np.float32)
+        if not glyphs:
+            logging.warning(f"⚠️ No digit glyphs in {glyph_dir}, loot OCR will use Tesseract")
+
+    @property
+    def digits(self) -> set:
+        """Digits the glyph set can recognize."""
+        return set(self.labels.tolist())
+
+    def recognize(self, crop) -> tuple[str, float]:
+        """
+        Read the digits in a crop.
+
+        Returns:
+            tuple: (digits read, confidence 0-1.0: the weakest glyph correlation; 0 if nothing was read)
+        """
+        glyphs = segment_glyphs(crop)
+        if not glyphs or not len(self.vectors):
+            return "", 0.0
+        scores = glyph_vectors([normalize_glyph(g) for g in glyphs]) @ self.vectors.T
+        best = scores.argmax(axis=1)
+        text = "".join(self.labels[best])
+        confidence = float(scores[np.arange(len(best)), best].min())
+        return text, confidence
+
+    def is_confident(self, confidence: float) -> bool:
+        return confidence >= self.min_confidence
+
+
+def add_glyphs(crop, label: str, glyph_dir=GLYPH_DIR) -> int:
+    """Save the glyphs of a crop whose value is known. Returns the number of glyphs saved."""
+    glyphs = segment_glyphs(crop)
+    if len(glyphs) != len(label):
+        raise ValueError(f"Found {len(glyphs)} glyphs but the label has {len(label)} digits")
+    os.makedirs(glyph_dir, exist_ok=True)
+    known = DigitRecognizer(glyph_dir)
+    saved = 0
+    for digit, mask in zip(label, glyphs):
+        glyph = normalize_glyph(mask)
+        # Skip glyphs the set already recognizes almost perfectly
+        if len(known.vectors):
+            scores = glyph_vectors([glyph]) @ known.vectors.T
+            if scores.max() >= 0.97 and known.labels[scores.argmax()] == digit:
+                continue
+        index = len(glob.glob(os.path.join(glyph_dir, f"{digit}_*.png")))
+        cv2.imwrite(os.path.join(glyph_dir, f"{digit}_{index}.png"), (np.clip(glyph, 0, 1) * 255).astype(np.uint8))
+        known = DigitRecognizer(glyph_dir)
+        saved += 1
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add digit glyphs from a crop with a known value")
+    parser.add_argument("command", choices=["add"])
+    parser.add_argument("image", help="Crop of a loot number, or a screenshot with --bbox")
+    parser.add_argument("label", help="The digits shown, without separators (e.g. 1774422)")
+    parser.add_argument("--bbox", nargs=4, type=int, metavar=("X1", "Y1", "X2", "Y2"))
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image)
+    if image is None:
+        raise SystemExit(f"Could not read {args.image}")
+    if args.bbox:
+        x1, y1, x2, y2 = args.bbox
+        image = image[y1:y2, x1:x2]
+    saved = add_glyphs(image, args.label)
+    print(f"Saved {saved} new glyphs to {GLYPH_DIR}; digits covered: {''.join(sorted(DigitRecognizer().digits))}")
+
+
+if __name__ == "__main__":
+    main()
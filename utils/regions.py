@@ -0,0 +1,136 @@
+"""
+Where each template is expected on screen, as normalized (x1, y1, x2, y2) rectangles.
+
+Coordinates are fractions of the frame width and height (measured on a 1600x720
+landscape screen), so the manifest holds for any resolution with the same UI
+layout. Templates that can appear anywhere (e.g. resource collectors on the home
+village) are left out and are always searched on the full frame.
+
+Check that every region contains its template's match on reference captures:
+    python -m utils.regions [reference.png ...]
+
+The default references are the two recorded captures in the repo root: result.png
+(the army window open over the home village) and troop_detection.png (the scouting
+screen, with the battle card bar).
+"""
+
+# Margin added around every region, as a fraction of the frame size
+DEFAULT_MARGIN = 0.03
+
+# Troop/spell/hero card bar at the bottom of the battle screen
+CARD_BAR = (0.0, 0.78, 1.0, 1.0)
+
+SEARCH_REGIONS = {
+    # Battle screen
+    "attack_sequence/super_minion.png": CARD_BAR,
+    "attack_sequence/spell.png": CARD_BAR,
+    "attack_sequence/spell_ice.png": CARD_BAR,
+    "attack_sequence/hero_1.png": CARD_BAR,
+    "attack_sequence/hero_2.png": CARD_BAR,
+    "attack_sequence/hero_3.png": CARD_BAR,
+    "attack_sequence/hero_4.png": CARD_BAR,
+    "attack_sequence/end_battle.png": (0.03, 0.71, 0.13, 0.78),
+    "attack_sequence/attack_menu.png": (0.13, 0.71, 0.26, 0.78),
+    "starting_sequence/end_battle.png": (0.03, 0.71, 0.13, 0.78),
+
+    # Scouting screen
+    "search_sequence/next_button.png": (0.84, 0.64, 0.97, 0.78),
+
+    # Home village
+    "search_sequence/attack_button.png": (0.03, 0.80, 0.12, 0.97),
+    "starting_sequence/attack_button.png": (0.03, 0.80, 0.12, 0.97),
+    "check_train_army/train_button.png": (0.03, 0.67, 0.08, 0.78),
+    "train_sequence/train_button.png": (0.03, 0.67, 0.08, 0.78),
+
+    # Attack menu
+    "search_sequence/find_match.png": (0.0, 0.40, 0.50, 1.0),
+    "starting_sequence/find_match.png": (0.0, 0.40, 0.50, 1.0),
+
+    # Army / training window
+    "starting_sequence/close.png": (0.50, 0.0, 1.0, 0.25),
+    "train_sequence/close.png": (0.50, 0.0, 1.0, 0.25),
+    "train_sequence/train_menu.png": (0.15, 0.0, 0.85, 0.15),
+    "train_sequence/quick_train_button.png": (0.15, 0.0, 0.85, 0.15),
+    "check_train_army/troops.png": (0.15, 0.10, 0.85, 0.50),
+    "check_train_army/spells.png": (0.15, 0.10, 0.85, 0.50),
+    "check_train_army/heroes.png": (0.15, 0.10, 0.85, 0.50),
+}
+
+# Templates whose region only holds on one screen, keyed to a template identifying it:
+# the card icons are also listed, elsewhere, in the army window
+REGION_SCREEN_ANCHORS = {
+    key: "attack_sequence/end_battle.png" for key, region in SEARCH_REGIONS.items() if region == CARD_BAR
+}
+
+
+def region_bbox(region, frame_width: int, frame_height: int, template_size: tuple[int, int],
+                margin=DEFAULT_MARGIN) -> tuple[int, int, int, int]:
+    """
+    Convert a normalized region to a pixel (x1, y1, x2, y2) box within the frame.
+
+    The region is grown by the margin and, if needed, to fit the template.
+    """
+    x1, y1, x2, y2 = region
+    left = max(0, int((x1 - margin) * frame_width))
+    top = max(0, int((y1 - margin) * frame_height))
+    right = min(frame_width, int(round((x2 + margin) * frame_width)))
+    bottom = min(frame_height, int(round((y2 + margin) * frame_height)))
+
+    template_width, template_height = template_size
+    if right - left < template_width:
+        left = max(0, min(left, frame_width - template_width))
+        right = min(frame_width, left + template_width)
+    if bottom - top < template_height:
+        top = max(0, min(top, frame_height - template_height))
+        bottom = min(frame_height, top + template_height)
+    return left, top, right, bottom
+
+
+def main():
+    # Imported here: the matcher itself reads SEARCH_REGIONS
+    import argparse
+    import os
+    from utils.frame import Frame
+    from utils.image_utils import ImageUtils
+    from utils.template_registry import TemplateRegistry
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Check that every region contains its template's match")
+    parser.add_argument("frames", nargs="*", help="Reference captures (default: the recorded ones in the repo)",
+                        default=[os.path.join(repo_root, "result.png"), os.path.join(repo_root, "troop_detection.png")])
+    parser.add_argument("--min-confidence", type=float, default=0.8)
+    args = parser.parse_args()
+
+    # All templates in BGR: the known position, independent of the chosen match modes
+    registry = TemplateRegistry(match_modes={})
+    failures = 0
+    for path in args.frames:
+        frame = Frame.wrap(path)
+        if frame is None:
+            raise SystemExit(f"Could not read {path}")
+        shown = {}
+        for key in set(SEARCH_REGIONS) | set(REGION_SCREEN_ANCHORS.values()):
+            template = registry.get(key)
+            if template is not None:
+                # Full-frame match, independent of the regions under test
+                position, confidence = ImageUtils.match_template(frame.image, template)
+                if confidence >= args.min_confidence:
+                    shown[key] = position
+        for key, region in SEARCH_REGIONS.items():
+            anchor = REGION_SCREEN_ANCHORS.get(key)
+            if key not in shown or (anchor is not None and anchor not in shown):
+                continue
+            template = registry.get(key)
+            x, y = shown[key]
+            left, top, right, bottom = region_bbox(region, frame.width, frame.height, template.size)
+            inside = left <= x and top <= y and x + template.width <= right and y + template.height <= bottom
+            failures += not inside
+            print(f"{'ok  ' if inside else 'MISS'} {key:<42} match {(x, y, x + template.width, y + template.height)} "
+                  f"region {(left, top, right, bottom)} on {os.path.basename(path)}")
+    if failures:
+        raise SystemExit(f"{failures} matches fall outside their region")
+    print("Every match lies inside its region")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Work out which screen the game shows from a single frame.
+
+Every screen is identified by a few templates that only appear on it. They are checked
+from the most to the least specific screen through the cheap probes only (ImageUtils.probe:
+pixel fingerprints, then a match within the template's search region); a frame no probe
+recognises is labelled UNKNOWN rather than searched in full. Templates with neither a
+fingerprint nor a region cannot be probed, so their screens (home, battle results) are
+only confirmed by is_screen, which falls back to matching that screen's templates. The
+label is stored on the Frame, so sequences asking about the same frame share one
+classification.
+"""
+import logging
+from utils.frame import Frame
+from utils.image_utils import ImageUtils
+
+HOME = "home"
+ATTACK_MENU = "attack menu"
+SEARCHING = "searching"
+BATTLE = "battle"
+BATTLE_RESULTS = "battle results"
+TRAIN_MENU = "train menu"
+POPUP = "popup"
+UNKNOWN = "unknown"
+
+# (screen, templates of which any one identifies it), most specific first:
+# the scouting screen also shows end_battle, and popups cover the home village
+SCREEN_SIGNATURES = [
+    (BATTLE_RESULTS, ["attack_sequence/return_home.png", "attack_sequence/claim_reward.png",
+                      "attack_sequence/continue.png"]),
+    (SEARCHING, ["search_sequence/next_button.png"]),
+    (BATTLE, ["attack_sequence/end_battle.png"]),
+    (TRAIN_MENU, ["train_sequence/train_menu.png", "train_sequence/quick_train_button.png"]),
+    (ATTACK_MENU, ["search_sequence/find_match.png"]),
+    (POPUP, ["train_sequence/close.png"]),
+    (HOME, ["starting_sequence/home_anker.png", "train_sequence/home_anker.png"]),
+]
+
+
+class ScreenClassifier:
+    """Labels frames with the screen they show (see SCREEN_SIGNATURES)."""
+
+    def __init__(self, adb, image=None, confidence_threshold=0.8):
+        self.adb = adb
+        self.image = image or ImageUtils()
+        self.confidence_threshold = confidence_threshold
+        # Templates resolved once: all of them confirm a screen (is_screen); classify reads
+        # every fingerprint, then matches one template per screen within its region
+        self.templates = {}
+        self.fingerprinted = []
+        self.regional = []
+        for screen, keys in SCREEN_SIGNATURES:
+            templates = [self.image.get_template(key) for key in keys]
+            templates = [template for template in templates if template is not None]
+            self.templates[screen] = templates
+            self.fingerprinted += [(screen, t) for t in templates
+                                   if t.key in self.image.fingerprints and self.image.fingerprints[t.key].validated]
+            self.regional += [(screen, t) for t in templates if t.region is not None][:1]
+        self.probeable = {screen for screen, _ in self.fingerprinted + self.regional}
+        self.classify_count = 0
+
+    def classify(self, frame) -> str:
+        """Return the screen label of a frame (UNKNOWN if no cheap probe recognises it)."""
+        frame = Frame.wrap(frame)
+        if frame is None:
+            return UNKNOWN
+        if frame.screen_state is not None:
+            return frame.screen_state
+
+        self.classify_count += 1
+        frame.screen_state = UNKNOWN
+        shown = self.fingerprinted_screens(frame)
+        # Regions are probed in SCREEN_SIGNATURES order, only for screens more specific than
+        # any the fingerprints found
+        for screen, template in self.regional:
+            if screen in shown:
+                break
+            if self.image.probe(frame, template, self.confidence_threshold):
+                shown.add(screen)
+                break
+        for screen, _ in SCREEN_SIGNATURES:
+            if screen in shown:
+                frame.screen_state = screen
+                break
+        return frame.screen_state
+
+    def fingerprinted_screens(self, frame) -> set:
+        """Screens whose fingerprints say they are shown (microseconds)."""
+        return {screen for screen, template in self.fingerprinted
+                if self.image.check_fingerprint(frame, template, self.confidence_threshold)}
+
+    def is_screen(self, frame, screen) -> bool:
+        """
+        Whether a frame shows the given screen: its label if the probes recognised a screen,
+        otherwise a match of that screen's templates. Screens without probes (e.g. home)
+        skip the region probes and go straight to their own templates, unless a fingerprint
+        already shows another screen.
+        """
+        frame = Frame.wrap(frame)
+        if frame is None:
+            return False
+        label = UNKNOWN
+        if frame.screen_state is not None or screen in self.probeable or self.fingerprinted_screens(frame):
+            label = self.classify(frame)
+        if label != UNKNOWN:
+            return label == screen
+        return any(self.image.is_shown(frame, template, self.confidence_threshold)
+                   for template in self.templates.get(screen, []))
+
+    def current(self, max_age=1.0) -> tuple[str, Frame | None]:
+        """
+        Classify the screen as it is now, reusing the last screenshot if nothing was sent
+        to the device since it was taken.
+
+        Returns:
+            tuple: (screen label, the Frame it was read from or None if capture failed)
+        """
+        frame = self.adb.recent_frame(max_age)
+        screen = self.classify(frame)
+        logging.info(f"🧭 Screen: {screen}")
+        return screen, frame
@@ -0,0 +1,75 @@
+"""
+Detect when parts of the screen have stopped changing.
+
+A RegionSettle is a wait_for predicate: it remembers the previous frame it was shown and
+answers True once its boxes have stayed unchanged for settle_time seconds. Frames that
+are nearly uniform (loading clouds, fades) never count as settled and restart the clock.
+Given the frame of the screen being left, frames that still show it are ignored too, so
+the old screen lingering for a moment after a tap is not mistaken for the new one.
+Checks and resets are serialized, so one thread may reset while another is checking.
+"""
+import threading
+
+import numpy as np
+
+# Mean grayscale difference within a box above which it counts as changed
+SETTLE_TOLERANCE = 2.0
+# Standard deviation of the frame signature below which a frame counts as uniform
+UNIFORM_STD = 12.0
+
+
+class RegionSettle:
+    """Callable taking Frames; True once every box stayed unchanged for settle_time seconds."""
+
+    def __init__(self, bboxes, settle_time=0.25, tolerance=SETTLE_TOLERANCE, uniform_std=UNIFORM_STD):
+        """
+        Args:
+            bboxes: Boxes (x1, y1, x2, y2) that must stop changing
+            settle_time: Seconds the boxes must stay unchanged
+            tolerance: Mean grayscale difference within a box that counts as a change
+            uniform_std: Frames whose signature varies less than this are treated as loading
+        """
+        self.bboxes = list(bboxes)
+        self.settle_time = settle_time
+        self.tolerance = tolerance
+        self.uniform_std = uniform_std
+        # Reentrant: a check resets the state itself when it sees a loading frame
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self, departed=None):
+        """
+        Forget the previous frame, e.g. after an action changed the screen.
+
+        Args:
+            departed: Frame of the screen being left; frames identical to it in the boxes
+                are ignored until one differs
+        """
+        with self.lock:
+            self.previous = None
+            self.stable_since = None
+            self.departed = departed
+
+    def differs(self, frame, other) -> bool:
+        return any(frame.region_differs(other, bbox, self.tolerance) for bbox in self.bboxes)
+
+    def is_uniform(self, frame) -> bool:
+        return float(np.std(frame.signature)) < self.uniform_std
+
+    def __call__(self, frame) -> bool:
+        with self.lock:
+            return self.check(frame)
+
+    def check(self, frame) -> bool:
+        if self.is_uniform(frame):
+            self.reset()
+            return False
+        if self.departed is not None:
+            if not self.differs(frame, self.departed):
+                return False
+            self.departed = None
+        previous, self.previous = self.previous, frame
+        if previous is None or self.differs(frame, previous):
+            self.stable_since = frame.timestamp
+            return False
+        return frame.timestamp - self.stable_since >= self.settle_time
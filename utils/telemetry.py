@@ -0,0 +1,224 @@
+"""
+Loot telemetry: one row per scouted base in an SQLite database.
+
+Every base the search decides on is recorded with its loot, OCR confidence, decision
+and the time it took. Records are queued and written in batches by a background
+thread, so the search never waits on the disk. The database (loot.sqlite) lives in the
+working directory, so farm.py keeps one per device.
+
+Loot distributions over time, and how many bases given thresholds would have attacked:
+    python -m utils.telemetry [loot.sqlite farm/*/loot.sqlite ...] [--days 7] [--bucket day]
+                              [--device serial] [--thresholds 1000000 1000000 5000]
+"""
+import argparse
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import numpy as np
+
+TELEMETRY_FILE = "loot.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bases (
+    timestamp REAL NOT NULL,
+    device TEXT,
+    gold INTEGER,
+    elixir INTEGER,
+    dark INTEGER,
+    confidence REAL,
+    decision TEXT NOT NULL,
+    seconds REAL,
+    reads_skipped INTEGER
+);
+CREATE INDEX IF NOT EXISTS bases_timestamp ON bases (timestamp);
+"""
+COLUMNS = ("timestamp", "device", "gold", "elixir", "dark", "confidence", "decision", "seconds", "reads_skipped")
+
+
+class LootTelemetry:
+    """Buffered, append-only store of scouted bases (see the module docstring)."""
+
+    def __init__(self, path=TELEMETRY_FILE, device=None, batch_size=100, flush_interval=5.0, max_pending=10000):
+        """
+        Args:
+            path: SQLite database file
+            device: Device serial stored with every row
+            batch_size: Rows written per transaction once this many are pending
+            flush_interval: Longest time in seconds a row waits before it is written
+            max_pending: Rows kept in memory if the writer falls behind; more are dropped
+        """
+        self.path = path
+        self.device = device
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.written = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="loot-telemetry", daemon=True)
+        self.thread.start()
+
+    def record(self, base: dict):
+        """
+        Queue one base for writing (never blocks).
+
+        Args:
+            base: Dict with the COLUMNS as keys; missing values are stored as NULL and the
+                timestamp and device default to now and this store's device
+        """
+        row = dict(base)
+        row.setdefault("timestamp", time.time())
+        row.setdefault("device", self.device)
+        try:
+            self.pending.put_nowait(tuple(row.get(column) for column in COLUMNS))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        try:
+            connection = sqlite3.connect(self.path)
+            connection.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            logging.warning(f"⚠️ Loot telemetry disabled, could not open {self.path}: {e}")
+            self.running = False
+            return
+
+        while self.running or not self.pending.empty():
+            rows = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size and (self.running or not self.pending.empty()):
+                try:
+                    rows.append(self.pending.get(timeout=max(0.0, min(0.5, deadline - time.monotonic()))))
+                except queue.Empty:
+                    if time.monotonic() >= deadline:
+                        break
+            if not rows:
+                continue
+            try:
+                with connection:
+                    connection.executemany(
+                        f"INSERT INTO bases ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+                self.written += len(rows)
+            except sqlite3.Error as e:
+                self.dropped += len(rows)
+                logging.warning(f"⚠️ Could not write {len(rows)} bases to {self.path}: {e}")
+        connection.close()
+
+    def close(self):
+        """Write the rows still pending and stop the writer."""
+        self.running = False
+        self.thread.join(timeout=10)
+        if self.dropped:
+            logging.warning(f"⚠️ Loot telemetry dropped {self.dropped} bases")
+
+
+_loot_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_loot_telemetry(device=None) -> LootTelemetry:
+    """Return the process-wide telemetry store, opening it on first use."""
+    global _loot_telemetry
+    with _telemetry_lock:
+        if _loot_telemetry is None:
+            _loot_telemetry = LootTelemetry(device=device)
+        return _loot_telemetry
+
+
+def close_loot_telemetry():
+    """Close the process-wide telemetry store if it was opened; does nothing otherwise."""
+    global _loot_telemetry
+    with _telemetry_lock:
+        telemetry, _loot_telemetry = _loot_telemetry, None
+    if telemetry is not None:
+        telemetry.close()
+
+
+def load_bases(paths, since=None, device=None) -> list[tuple]:
+    """Rows (timestamp, device, gold, elixir, dark, decision) from several databases, oldest first."""
+    query = "SELECT timestamp, device, gold, elixir, dark, decision FROM bases WHERE timestamp >= ?"
+    arguments = [since or 0]
+    if device:
+        query += " AND device = ?"
+        arguments.append(device)
+    rows = []
+    for path in paths:
+        try:
+            connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        except sqlite3.Error as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        try:
+            rows.extend(connection.execute(query, arguments).fetchall())
+        except sqlite3.Error as e:
+            # Empty or foreign database without the bases table, or not SQLite at all
+            print(f"Skipping {path}: {e}")
+        finally:
+            connection.close()
+    return sorted(rows)
+
+
+def percentiles(values, qs=(50, 75, 90)) -> str:
+    """Percentiles of the values that were read (missing and failed reads are NULL or 0)."""
+    values = [v for v in values if v]
+    if not values:
+        return " ".join(f"{'-':>9}" for _ in qs)
+    return " ".join(f"{v:>9,.0f}" for v in np.percentile(values, qs))
+
+
+def would_attack(values, thresholds) -> bool | None:
+    """
+    Whether the 2-of-3 rule attacks a base at the given thresholds.
+
+    Returns:
+        bool | None: None if a missing (NULL) value could change the answer
+    """
+    met = sum(1 for value, threshold in zip(values, thresholds) if value is not None and value >= threshold)
+    missing = sum(value is None for value in values)
+    if met >= 2 or met + missing < 2:
+        return met >= 2
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loot distributions of scouted bases over time")
+    parser.add_argument("databases", nargs="*", default=[TELEMETRY_FILE])
+    parser.add_argument("--days", type=float, default=7, help="Only bases from the last DAYS days")
+    parser.add_argument("--bucket", choices=["hour", "day"], default="day")
+    parser.add_argument("--device", help="Only bases scouted on this device")
+    parser.add_argument("--thresholds", nargs=3, type=int, metavar=("GOLD", "ELIXIR", "DARK"),
+                        help="Also show the share of bases these thresholds would attack")
+    args = parser.parse_args()
+
+    rows = load_bases(args.databases, since=time.time() - args.days * 86400, device=args.device)
+    if not rows:
+        raise SystemExit("No bases recorded")
+    bucket_format = "%Y-%m-%d %H:00" if args.bucket == "hour" else "%Y-%m-%d"
+    buckets = {}
+    for row in rows:
+        buckets.setdefault(time.strftime(bucket_format, time.localtime(row[0])), []).append(row)
+
+    incomplete = sum(any(value is None for value in row[2:5]) for row in rows)
+    if incomplete:
+        # Written before skipped reads were filled in after the tap; the missing value is one the decision did not need
+        print(f"{incomplete} bases lack a loot value and are left out where it matters")
+    print("Loot percentiles (p50 p75 p90) of the values read")
+    header = f"{'period':<16} {'bases':>6} {'attack':>7}  {'gold':^29}  {'elixir':^29}  {'dark':^29}"
+    if args.thresholds:
+        header += f" {'would attack':>13}"
+    print(header)
+    for period, bucket in list(buckets.items()) + [("all", rows)]:
+        attacks = sum(row[5] == "ATTACK" for row in bucket)
+        line = (f"{period:<16} {len(bucket):>6} {attacks / len(bucket):>7.1%}  "
+                + "  ".join(percentiles([row[column] for row in bucket]) for column in (2, 3, 4)))
+        if args.thresholds:
+            outcomes = [would_attack(row[2:5], args.thresholds) for row in bucket]
+            decided = [outcome for outcome in outcomes if outcome is not None]
+            line += f" {sum(decided) / len(decided):>13.1%}" if decided else f" {'-':>13}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
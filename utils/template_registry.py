@@ -0,0 +1,147 @@
+import os
+import glob
+import logging
+import threading
+import json
+import cv2
+from utils.frame import match_view
+from utils.regions import SEARCH_REGIONS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Sequence packages whose images/ folder holds matching templates
+TEMPLATE_PACKAGES = [
+    "attack_sequence",
+    "search_sequence",
+    "starting_sequence",
+    "train_sequence",
+    "check_train_army",
+]
+
+# Match mode per template key, written by benchmarks/bench_match_modes.py
+MATCH_MODES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "match_modes.json")
+
+
+def load_match_modes(path=MATCH_MODES_FILE) -> dict:
+    """Read the per-template match modes (templates not listed are matched in BGR)."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"⚠️ Could not read match modes from {path}: {e}")
+        return {}
+
+
+class Template:
+    """A decoded template image with its size, click offset, search region and match mode."""
+
+    def __init__(self, key: str, path: str, image, region=None, mode="bgr"):
+        self.key = key
+        self.path = path
+        self.name = os.path.basename(path)
+        self.image = image
+        # Normalized (x1, y1, x2, y2) area the template is expected in (None: anywhere)
+        self.region = region
+        # Representation the template is matched in ("bgr", "gray" or "edge")
+        self.mode = mode
+        self.height, self.width = image.shape[:2]
+        self.size = (self.width, self.height)
+        self.center_offset = (self.width // 2, self.height // 2)
+        self._views = {}
+        self._pyramids = {}
+
+    def center(self, position: tuple[int, int]) -> tuple[int, int]:
+        """Centre of the template when its top-left corner is at the given position."""
+        return position[0] + self.center_offset[0], position[1] + self.center_offset[1]
+
+    def view(self, mode: str = None):
+        """Template image in a match mode's representation (default: its own mode)."""
+        mode = mode or self.mode
+        if mode not in self._views:
+            self._views[mode] = match_view(self.image, mode)
+        return self._views[mode]
+
+    def pyramid(self, level: int, mode: str = None):
+        """Template view downscaled by 2**level, matching Frame.pyramid."""
+        mode = mode or self.mode
+        if level == 0:
+            return self.view(mode)
+        pyramid = self._pyramids.setdefault(mode, [])
+        while len(pyramid) < level:
+            previous = pyramid[-1] if pyramid else self.view(mode)
+            pyramid.append(cv2.pyrDown(previous))
+        return pyramid[level - 1]
+
+    def __repr__(self):
+        return f"Template({self.key!r}, {self.width}x{self.height})"
+
+
+class TemplateRegistry:
+    """
+    All sequence templates, decoded once and looked up by key or file path.
+
+    Keys have the form "<package>/<file name>", e.g. "search_sequence/next_button.png".
+    Paths outside the registered folders are loaded on first use and cached.
+    """
+
+    def __init__(self, root=REPO_ROOT, packages=TEMPLATE_PACKAGES, match_modes=None):
+        self.templates = {}
+        self.by_path = {}
+        self.match_modes = load_match_modes() if match_modes is None else match_modes
+        self.lock = threading.Lock()
+        for package in packages:
+            for path in sorted(glob.glob(os.path.join(root, package, "images", "*.png"))):
+                self._load(f"{package}/{os.path.basename(path)}", path)
+        logging.info(f"Loaded {len(self.templates)} templates")
+
+    def _load(self, key: str, path: str):
+        image = cv2.imread(path)
+        if image is None:
+            logging.warning(f"⚠️ Could not load template: {path}")
+            return None
+        template = Template(key, path, image, region=SEARCH_REGIONS.get(key),
+                            mode=self.match_modes.get(key, "bgr"))
+        self.templates[key] = template
+        self.by_path[os.path.abspath(path)] = template
+        return template
+
+    def get(self, template) -> Template | None:
+        """
+        Look up a template by key or path (a Template is returned as is).
+
+        Returns:
+            Template: The decoded template, or None if it does not exist
+        """
+        if isinstance(template, Template):
+            return template
+        if template in self.templates:
+            return self.templates[template]
+
+        path = os.path.abspath(template)
+        with self.lock:
+            if path in self.by_path:
+                return self.by_path[path]
+            if not os.path.exists(path):
+                return None
+            return self._load(path, path)
+
+    def __contains__(self, key):
+        return key in self.templates
+
+    def __iter__(self):
+        return iter(self.templates.values())
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Return the process-wide template registry, loading it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry()
+        return _registry